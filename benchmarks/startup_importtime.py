@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Startup benchmark of the scripts. Each entry point is run with
+python -X importtime SCRIPT --help and the import time reported by python
+is summed, with the wall time of the run and the heaviest top-level imports.
+
+Use --out_csv to save the results and --baseline to compare with a
+previous run.
+
+> benchmarks/startup_importtime.py --out_csv startup.csv
+> benchmarks/startup_importtime.py --baseline startup.csv df_operations.py
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# if __name__ == '__main__': with single or double quotes
+MAIN_GUARD = re.compile(r"""^if\s+__name__\s*==\s*(['"])__main__\1\s*:""",
+                        re.MULTILINE)
+
+
+def _build_arg_parser():
+    p = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
+                                description=__doc__)
+    p.add_argument('in_scripts', nargs='*',
+                   help='Scripts to benchmark, relative to the repository.\n'
+                        'By default, all entry points of the repository.')
+    p.add_argument('--repeat', type=int, default=3,
+                   help='Number of runs by script, the fastest is kept. '
+                        '[%(default)s]')
+    p.add_argument('--top', type=int, default=3,
+                   help='Number of heaviest imports reported. '
+                        '[%(default)s]')
+    p.add_argument('--out_csv',
+                   help='CSV file to save the results.')
+    p.add_argument('--baseline',
+                   help='CSV file of a previous run to compare with.')
+    return p
+
+
+def list_entry_points():
+    """List the scripts of the repository that can be run."""
+    scripts = []
+    for curr in sorted(glob.glob(os.path.join(REPO_DIR, '*.py')) +
+                       glob.glob(os.path.join(REPO_DIR, 'generic_scripts',
+                                              '*.py'))):
+        with open(curr) as f:
+            if MAIN_GUARD.search(f.read()):
+                scripts.append(os.path.relpath(curr, REPO_DIR))
+    return scripts
+
+
+def parse_importtime(stderr):
+    """
+    Parse the output of -X importtime.
+
+    Return  Total import time (us) and list of (package, cumulative time)
+            of the top-level imports.
+    """
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, package = line[len('import time:'):].split('|')
+        # Nested imports are indented
+        if not package[1:].startswith(' '):
+            top_level.append((package.strip(), int(cumulative)))
+    return sum(curr[1] for curr in top_level), top_level
+
+
+def benchmark_script(script, repeat=3):
+    """
+    Run a script with --help under -X importtime.
+
+    Return  Dictionary with the import time (ms), wall time (ms), exit code
+            and the top-level imports of the fastest run.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [REPO_DIR] + [curr for curr in [env.get('PYTHONPATH')] if curr])
+    best = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        run = subprocess.run([sys.executable, '-X', 'importtime', script,
+                              '--help'], cwd=REPO_DIR, env=env,
+                             stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, text=True)
+        wall = (time.perf_counter() - start) * 1000
+        import_us, top_level = parse_importtime(run.stderr)
+        if best is None or wall < best['wall_ms']:
+            best = {'script': script, 'import_ms': import_us / 1000,
+                    'wall_ms': wall, 'returncode': run.returncode,
+                    'top_level': sorted(top_level, key=lambda x: -x[1])}
+    return best
+
+
+def load_baseline(filename):
+    """Load the results of a previous run."""
+    with open(filename) as f:
+        return {row['script']: row for row in csv.DictReader(f)}
+
+
+def main():
+    parser = _build_arg_parser()
+    args = parser.parse_args()
+
+    if args.baseline and not os.path.isfile(args.baseline):
+        parser.error('Input file {} does not exist'.format(args.baseline))
+
+    scripts = args.in_scripts or list_entry_points()
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+
+    results = []
+    print('{:<45} {:>10} {:>10} {:>10}  {}'.format(
+        'Script', 'Import ms', 'Wall ms', 'Delta ms', 'Heaviest imports'))
+    for script in scripts:
+        result = benchmark_script(script, repeat=args.repeat)
+        results.append(result)
+
+        delta = ''
+        if script in baseline:
+            delta = '{:+.0f}'.format(result['import_ms'] -
+                                     float(baseline[script]['import_ms']))
+        heaviest = ', '.join('{} {:.0f}'.format(name, us / 1000)
+                             for name, us in
+                             result['top_level'][:args.top])
+        if result['returncode'] != 0:
+            heaviest = 'FAILED ({}) {}'.format(result['returncode'],
+                                               heaviest)
+        print('{:<45} {:>10.0f} {:>10.0f} {:>10}  {}'.format(
+            script, result['import_ms'], result['wall_ms'], delta, heaviest))
+
+    if args.out_csv:
+        with open(args.out_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['script', 'import_ms', 'wall_ms', 'returncode'])
+            for result in results:
+                writer.writerow([result['script'],
+                                 '{:.1f}'.format(result['import_ms']),
+                                 '{:.1f}'.format(result['wall_ms']),
+                                 result['returncode']])
+
+
+if __name__ == '__main__':
+    main()
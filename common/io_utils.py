@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Set of functions used by the scripts to define common arguments and check
+inputs/outputs. Same behavior as their scilpy.io.utils equivalent, without
+importing scilpy at startup.
+"""
+
+import multiprocessing
+import os
+import shutil
+
+
+def add_overwrite_arg(parser):
+    """Add the -f option to overwrite the outputs."""
+    parser.add_argument('-f', dest='overwrite', action='store_true',
+                        help='Force overwriting of the output files.')
+
+
+def add_shared_plotlyjs_arg(parser, relative_to='--out_dir'):
+    """Add the --shared_plotlyjs option (see plots.utils.write_shared_plotlyjs).
+    relative_to is the folder of the path given in the help."""
+    parser.add_argument('--shared_plotlyjs', nargs='?', const='plotly.min.js',
+                        help='Reference a shared plotly.js file instead of '
+                             'embedding it in each HTML.\nPath (.js) relative '
+                             'to {}, the file is written once if missing. '
+                             '[%(const)s]'.format(relative_to))
+
+
+def add_processes_arg(parser):
+    """Add the --processes option, stored in args.nbr_processes."""
+    parser.add_argument('--processes', dest='nbr_processes',
+                        metavar='NBR', type=int, default=1,
+                        help='Number of sub-processes to start. \n'
+                             'Default: [%(default)s]')
+
+
+def validate_nbr_processes(parser, args):
+    """
+    Check the number of processes given with --processes. If 0 or not
+    provided, all the available CPUs are used.
+
+    Return  Number of processes.
+    """
+    if args.nbr_processes:
+        nbr_cpu = args.nbr_processes
+    else:
+        nbr_cpu = multiprocessing.cpu_count()
+
+    if nbr_cpu <= 0:
+        parser.error('Number of processes must be > 0.')
+    elif nbr_cpu > multiprocessing.cpu_count():
+        parser.error('Max number of processes is {}. Got {}.'.format(
+            multiprocessing.cpu_count(), nbr_cpu))
+
+    return nbr_cpu
+
+
+def _as_list(files):
+    """Return files as a list, None or a single file are accepted."""
+    if files is None:
+        return []
+    if isinstance(files, str):
+        return [files]
+    return list(files)
+
+
+def assert_inputs_exist(parser, required, optional=None):
+    """
+    Check that all the inputs exist, parser.error otherwise.
+
+    parser:     Parser.
+    required:   File or list of files that must exist.
+    optional:   File or list of files checked only if not None.
+    """
+    for curr_file in _as_list(required) + _as_list(optional):
+        if curr_file is not None and not os.path.isfile(curr_file):
+            parser.error('Input file {} does not exist'.format(curr_file))
+
+
+def assert_outputs_exist(parser, args, required, optional=None,
+                         check_dir_exists=True):
+    """
+    Check that the outputs don't exist (unless -f is used) and that their
+    directory exists, parser.error otherwise.
+
+    parser:             Parser.
+    args:               Arguments of the script.
+    required:           File or list of output files.
+    optional:           File or list of files checked only if not None.
+    check_dir_exists:   Check that the output directories exist.
+    """
+    for curr_file in _as_list(required) + _as_list(optional):
+        if curr_file is None:
+            continue
+        if os.path.isfile(curr_file) and not args.overwrite:
+            parser.error('Output file {} exists. Use -f to force '
+                         'overwriting'.format(curr_file))
+        out_dir = os.path.dirname(curr_file)
+        if check_dir_exists and out_dir and not os.path.isdir(out_dir):
+            parser.error('Directory {} for a given output file does not '
+                         'exists.'.format(out_dir))
+
+
+def assert_output_dirs_exist_and_empty(parser, args, required,
+                                       optional=None, create_dir=False):
+    """
+    Check that the output directories exist and are empty. With -f, the
+    content of the directories is removed.
+
+    parser:         Parser.
+    args:           Arguments of the script.
+    required:       Directory or list of output directories.
+    optional:       Directory or list of directories checked if not None.
+    create_dir:     Create the missing directories instead of an error.
+    """
+    for curr_dir in _as_list(required) + _as_list(optional):
+        if curr_dir is None:
+            continue
+        if not os.path.isdir(curr_dir):
+            if not create_dir:
+                parser.error('Output directory {} doesn\'t exist.'.format(
+                    curr_dir))
+            os.makedirs(curr_dir, exist_ok=True)
+        if os.listdir(curr_dir):
+            if not args.overwrite:
+                parser.error('Output directory {} isn\'t empty and some '
+                             'files could be overwritten or even deleted. '
+                             'Use -f option if you want to continue.'.format(
+                                 curr_dir))
+            for the_file in os.listdir(curr_dir):
+                file_path = os.path.join(curr_dir, the_file)
+                if os.path.isdir(file_path):
+                    shutil.rmtree(file_path)
+                else:
+                    os.unlink(file_path)
+
+
+def split_name_with_nii(filename):
+    """
+    Return the filename without extension and the extension, .nii.gz is
+    considered as a single extension.
+    """
+    base, ext = os.path.splitext(filename)
+    if ext == '.gz':
+        base, ext_nii = os.path.splitext(base)
+        ext = ext_nii + ext
+    return base, ext
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Deferred import of the heavy backends (plotly, matplotlib, nibabel, ...).
+The module is only imported the first time one of its attributes is used,
+running --help or a script that doesn't plot does not pay its import time.
+
+> px = lazy_import('plotly.express')
+"""
+
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy importing the real module on first attribute access."""
+    def __init__(self, name):
+        super(LazyModule, self).__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """
+    Return a proxy of a module imported on first use.
+
+    name:   Full name of the module, ex. 'matplotlib.pyplot'.
+    """
+    return LazyModule(name)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Slice access of NIfTI images through the nibabel array proxy. The image is
+memory mapped when possible and only the requested slices are read and
+scaled, the whole volume is never loaded with get_fdata().
+"""
+
+import numpy as np
+
+from common.lazy import lazy_import
+
+nib = lazy_import('nibabel')
+
+
+def load_image(filename):
+    """
+    Load the header of a NIfTI image, the data stay on disk.
+
+    filename:   NIfTI image (.nii or .nii.gz).
+
+    Return      nibabel image, data are read with get_slice or get_slices.
+    """
+    return nib.load(filename, mmap=True)
+
+
+def check_volume_index(img, volume_index=None):
+    """
+    Check the volume index of a 4D image, raise ValueError if it is out of
+    range or given for a 3D image.
+
+    Return  Volume index (0 by default for 4D images, None for 3D images).
+    """
+    if len(img.shape) == 3:
+        if volume_index:
+            raise ValueError('Volume index given for a 3D image.')
+        return None
+    if len(img.shape) != 4:
+        raise ValueError('Only 3D and 4D images are supported, got shape '
+                         '{}.'.format(img.shape))
+    if volume_index is None:
+        volume_index = 0
+    if not 0 <= volume_index < img.shape[3]:
+        raise ValueError('Volume index {} out of range, the image has {} '
+                         'volumes.'.format(volume_index, img.shape[3]))
+    return volume_index
+
+
+def _proxy_index(img, z_index, volume_index=None):
+    """Index of the array proxy for a z slice (or slice object)."""
+    volume_index = check_volume_index(img, volume_index)
+    if volume_index is None:
+        return (slice(None), slice(None), z_index)
+    return (slice(None), slice(None), z_index, volume_index)
+
+
+def get_slice(img, z_slice, volume_index=None, dtype=np.float32):
+    """
+    Read a single axial slice of an image.
+
+    img:            nibabel image (see load_image).
+    z_slice:        Index of the slice on the z axis.
+    volume_index:   Volume of a 4D image. [0]
+    dtype:          Type of the returned array, scaling of the image
+                    (scl_slope, scl_inter) is applied.
+
+    Return          2D array (x, y).
+    """
+    return np.asarray(img.dataobj[_proxy_index(img, int(z_slice),
+                                               volume_index)], dtype=dtype)
+
+
+def get_slices(img, z_min=0, z_max=None, volume_index=None,
+               dtype=np.float32):
+    """
+    Read a contiguous range of axial slices of an image.
+
+    img:            nibabel image (see load_image).
+    z_min, z_max:   Range of slices on the z axis, z_max excluded.
+                    Default: all slices.
+    volume_index:   Volume of a 4D image. [0]
+    dtype:          Type of the returned array.
+
+    Return          3D array (x, y, z).
+    """
+    return np.asarray(img.dataobj[_proxy_index(img, slice(z_min, z_max),
+                                               volume_index)], dtype=dtype)
@@ -5,9 +5,17 @@
 Set of functions used to prepare or get information from dataframe.
 """
 
+import re
+
 import pandas as pd
 import numpy as np
 
+from dataframe.parameters import (column_dict_name, col_order,
+                                  columns_rename, list_method, list_metrics,
+                                  measure_dict, replace_dict,
+                                  scaling_metrics)
+from dataframe.utils import split_unique
+
 # original function
 #def split_col(x):
 ##    cols, value = x
@@ -44,39 +52,130 @@ def reshape_to_wide_format(long_format_df, selected_cols):
     return wide_format
 
 
+def _split_json_keys(keys, columns, key_columns):
+    """
+    Split the keys of a normalized json (sid.roi.metrics...) into columns.
+
+    keys:           Series of keys.
+    columns:        Names of the columns.
+    key_columns:    Name of the json, for the error message.
+
+    Return          Dataframe of the columns, with the index of the keys.
+    """
+    if len(keys) == 0:
+        return pd.DataFrame(columns=columns, index=keys.index)
+    parts = split_unique(keys, '.')
+    if parts.shape[1] != len(columns) or parts.isnull().values.any():
+        raise ValueError('Keys of {} do not match the columns {}.'.format(
+            key_columns, ', '.join(columns)))
+    parts.columns = columns
+    return parts
+
+
+def iter_lesion_data(df, colname_with_list, colname_without_list,
+                     chunksize=None, key_columns='lesion'):
+    """
+    Convert the normalized lesion jsons of tractometry_flow by chunks of
+    keys. Cells with a list of values (one value by lesion) are exploded
+    into one row by lesion, labeled from 1 in the order of the list.
+
+    df:                     Normalized json (columns index and 0).
+    colname_with_list:      Columns of the keys with list, the last two are
+                            the lesion label and the value.
+    colname_without_list:   Columns of the keys without list, the last is
+                            the value.
+    chunksize:              Number of keys by chunk. Default: all keys.
+    key_columns:            Name of the json, for error messages.
+
+    Return                  Iterator of dataframes in long format.
+    """
+    is_list = np.fromiter((isinstance(x, list) for x in df[0]),
+                          dtype=bool, count=len(df))
+    chunksize = chunksize or max(len(df), 1)
+    # At least one chunk, an empty json gives an empty dataframe
+    for start in range(0, max(len(df), 1), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        chunk_is_list = is_list[start:start + chunksize]
+
+        # Explode the lists, the index of a row is repeated for its lesions
+        df_list = chunk.loc[chunk_is_list, ['index', 0]].explode(0)
+        lesion_list = _split_json_keys(df_list['index'],
+                                       colname_with_list[:-2], key_columns)
+        lesion_list[colname_with_list[-2]] = (
+            df_list.groupby(level=0).cumcount() + 1).astype(str).values
+        lesion_list[colname_with_list[-1]] = df_list[0].values
+
+        df_nolist = chunk.loc[~chunk_is_list]
+        lesion_nolist = _split_json_keys(df_nolist['index'],
+                                         colname_without_list[:-1],
+                                         key_columns)
+        lesion_nolist[colname_without_list[-1]] = df_nolist[0].values
+
+        yield pd.concat([lesion_list, lesion_nolist], ignore_index=True,
+                        sort=False)
+
+
 def convert_lesion_data(df, colname_with_list, colname_without_list):
     """
     Function to deal with jsons which, when converted into a
     dataframe, creates lists in columns. For now, it's specific to
-    lesion_jsons output from tractometry_flow.
-    """
-    # extract data with list in column
-    df_list = df[df[0].apply(lambda x: isinstance(x, list))]
-    # Split columns with list into multiple rows
-    df_list = df_list.explode(0).reset_index(drop=True)
-    # Attribute labels to each lesion
-    for roi in df_list['index'].unique():
-        df_list.loc[df_list['index'] == roi, 'tmp'] = np.arange(
-            len(df_list[df_list['index'] == roi])) + 1
-    # Associate label to first column
-    df_list['index'] = df_list['index'
-                               ] + '.' + df_list['tmp'].astype(int).astype(str)
-    # Remove useless column
-    df_list.drop('tmp', axis=1, inplace=True)
-    # Split index into multiple columns
-    values_with_list = [split_col(x) for x in df_list[["index", 0]].values]
-    df_lesion_with_list = pd.DataFrame(columns=colname_with_list,
-                                       data=values_with_list)
-
-    # lesion json without list
-    df_nolist = df[~(df[0].apply(lambda x: isinstance(x, list)))]
-    values_without_list = [split_col(x)
-                           for x in df_nolist[["index", 0]].values]
-    df_lesion_without_list = pd.DataFrame(columns=colname_without_list,
-                                          data=values_without_list)
-
-    return pd.concat([df_lesion_with_list, df_lesion_without_list],
-                     ignore_index=True, sort=False)
+    lesion_jsons output from tractometry_flow (see iter_lesion_data).
+    """
+    return next(iter_lesion_data(df, colname_with_list,
+                                 colname_without_list))
+
+
+def convert_json_to_long_df(json_data, key_columns):
+    """
+    Convert the data of a json output by TractometryFlow (merged with
+    scil_json_merge_entries.py) into a long format dataframe.
+
+    json_data:      Dictionary loaded from the json.
+    key_columns:    Name of the json without extension (ex. mean_std), used
+                    to get the column names from column_dict_name.
+
+    Return          Dataframe in long format.
+    """
+    df = pd.json_normalize(json_data).T
+    df = df.reset_index(drop=False)
+
+    if 'lesion' in key_columns:
+        return convert_lesion_data(df, column_dict_name[key_columns][0],
+                                   column_dict_name[key_columns +
+                                                    '_nolist'][0])
+
+    # Define the column names based on number of columns
+    # This assumes that columns always have the same organization
+    long_columns = column_dict_name[key_columns][0]
+    long_df = _split_json_keys(df['index'], long_columns[:-1], key_columns)
+    long_df[long_columns[-1]] = df[0].values
+    return long_df
+
+
+def save_json_long_csv(json_data, key_columns, out_csv, chunksize=None):
+    """
+    Convert the data of a json output by TractometryFlow into a long format
+    CSV (see convert_json_to_long_df). Lesion jsons are converted and
+    written by chunks of keys.
+
+    json_data:      Dictionary loaded from the json.
+    key_columns:    Name of the json without extension.
+    out_csv:        Output CSV.
+    chunksize:      Number of keys converted at once for lesion jsons.
+                    Default: all keys.
+    """
+    if 'lesion' not in key_columns:
+        convert_json_to_long_df(json_data, key_columns).to_csv(out_csv,
+                                                               index=False)
+        return
+
+    df = pd.json_normalize(json_data).T.reset_index(drop=False)
+    chunks = iter_lesion_data(df, column_dict_name[key_columns][0],
+                              column_dict_name[key_columns + '_nolist'][0],
+                              chunksize=chunksize, key_columns=key_columns)
+    with open(out_csv, 'w', newline='') as f:
+        for idx, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=idx == 0)
 
 
 def apply_factor_to_metric(df, metric, factor, column='metrics'):
@@ -140,6 +239,67 @@ def filter_df(df, column, filter):
     return df_filter.reset_index(drop=True)
 
 
+def apply_exclusions(df, exclusions, substring_columns=None):
+    """
+    Remove the rows matching excluded values, with a single mask computed
+    in one pass over each column.
+
+    df:                 Dataframe.
+    exclusions:         Dictionary of {column: list of values to remove},
+                        None or empty lists are ignored.
+    substring_columns:  Columns where a row is removed if its value contains
+                        one of the excluded values (literal substring).
+                        Other columns are compared with exact matches.
+
+    Return              Dataframe without the excluded rows.
+    """
+    substring_columns = substring_columns or []
+    mask = np.zeros(len(df), dtype=bool)
+    for column, values in exclusions.items():
+        if not values:
+            continue
+        if column in substring_columns:
+            pattern = '|'.join(re.escape(str(value)) for value in values)
+            mask |= df[column].astype(str).str.contains(pattern).values
+        else:
+            values = pd.Series(values).astype(df[column].dtype)
+            mask |= df[column].isin(values).values
+    return df[~mask]
+
+
+def load_qc_exclusions(qc_csv, keys=['Sid', 'Bundles'], status=['Failed']):
+    """
+    List the data to exclude from the autoQC table output by
+    scil_bundle_autoqc_rdt_wip.py (df_autoqc).
+
+    qc_csv:     CSV file or dataframe of the autoQC.
+    keys:       Columns identifying the excluded data, ['Sid'] to exclude
+                whole subjects.
+    status:     Values of QC_global excluded.
+
+    Return      Dataframe of the unique excluded keys.
+    """
+    qc = qc_csv
+    if not isinstance(qc_csv, pd.DataFrame):
+        qc = pd.read_csv(qc_csv, usecols=keys + ['QC_global'])
+    qc = qc.loc[qc['QC_global'].isin(status), keys]
+    return qc.drop_duplicates().reset_index(drop=True)
+
+
+def anti_join(df, table):
+    """
+    Remove the rows of df whose values, in the columns of table, are a row
+    of table (hash anti-join).
+
+    Return  Dataframe without the matched rows.
+    """
+    columns = table.columns.tolist()
+    table = table.astype(df[columns].dtypes.to_dict())
+    keys = pd.MultiIndex.from_frame(table)
+    mask = pd.MultiIndex.from_frame(df[columns]).isin(keys)
+    return df[~mask]
+
+
 def extract_average_and_profile(df):
     """
     Function written for Stefano specific plots
@@ -155,6 +315,126 @@ def extract_average_and_profile(df):
 
     return average.reset_index(drop=True), profile.reset_index(drop=True)
 
+
+def prepare_scil_df(df, rm_rbx=None, rm_sid=None, rm_bundle=None,
+                    rm_measure=None, rm_section=None, merge_lr=False,
+                    rename_measure=False, rename_bundles=False,
+                    apply_factor=None, apply_factor_metric=None,
+                    compute_ecvf=False, longitudinal=None,
+                    substring_columns=['sid'], qc_exclusions=None):
+    """
+    Reshape a long format dataframe converted from TractometryFlow jsons
+    (see convert_json_to_long_df) to build the figures of the Read the Doc
+    site.
+
+    df:                     Dataframe in long format.
+    rm_rbx:                 RBX version to remove.
+    rm_sid:                 List of subjects to remove.
+    rm_bundle:              List of bundles to remove.
+    rm_measure:             List of measures to remove.
+    rm_section:             List of sections to remove.
+    merge_lr:               Merge left and right bundles.
+    rename_measure:         Rename MRI measures using measure_dict.
+    rename_bundles:         Remove the underscore from bundle names.
+    apply_factor:           Factor applied on MRI measures.
+    apply_factor_metric:    List of metrics where the factor is applied.
+                            By default, scaling_metrics.
+    compute_ecvf:           Compute ECVF using ICVF.
+    longitudinal:           Delimiter used to split Sid into Sid and Session.
+    substring_columns:      Columns (sid, roi, metrics, section) where
+                            rm_* values are matched as substrings, exact
+                            matches for the others.
+    qc_exclusions:          Dataframe of (Sid[, Bundles]) to remove, see
+                            load_qc_exclusions. Applied on the final
+                            column names.
+
+    Return                  Two dataframes, average and profile data.
+    """
+    df = df.copy()
+    columns = list(col_order)
+
+    df.loc[df.metrics.str.contains('length'), 'stats'] = df['metrics']
+    df.loc[df.metrics.str.contains('volume'), 'stats'] = 'volume'
+    df.loc[df.metrics.str.contains('count'), 'stats'] = 'count'
+    df.section = pd.to_numeric(df.section).replace(np.nan, 0)
+    df.section = df['section'].astype(int)
+
+    df.loc[df.roi.str.contains('v10'),'rbx_version']= 'v10'
+    df.loc[~df.roi.str.contains('v10'),'rbx_version']= 'v1'
+
+    # Drop index column and rename some pattern from columns
+    for key in replace_dict:
+        df[key] = df[key].replace(replace_dict[key],'', regex=True)
+
+    # Filtering dataframe
+    df = apply_exclusions(df, {'rbx_version': [rm_rbx] if rm_rbx else None,
+                               'sid': rm_sid, 'roi': rm_bundle,
+                               'metrics': rm_measure, 'section': rm_section},
+                          substring_columns=substring_columns)
+
+    # Attribute Method corresponding to metrics based on lists
+    for idx, metric in enumerate(list_metrics):
+        df.loc[df.metrics.isin(metric), 'Method'] = list_method[idx]
+
+    # Merge Left and right : remove L and R and mean row
+    if merge_lr:
+        df = merged_left_right_data(df, columns[:-1])
+    else:
+        df['roi'] = df.roi.replace({'_L':'_Left','_R':'_Right'}, regex=True)
+
+    if rename_measure:
+        # check lists
+        missing_metric = []
+        for metric_item in df['metrics'].unique():
+            if metric_item not in measure_dict:
+                missing_metric.append(metric_item)
+
+        if len(missing_metric) > 0:
+            print("The listed metrics don't match with the default "
+                  "metrics list.\nYou can add missing metrics in "
+                  " ALL requiring lists in utils.py.\n", missing_metric)
+        else:
+            # Rename measures using a dictionnary
+            df = df.replace({"metrics": measure_dict})
+
+    # Remove the underscore from Bundle name
+    if rename_bundles:
+        df['roi'] = df.roi.replace('_', ' ', regex=True)
+
+    # Apply a scale factor for diffusion measure
+    if apply_factor:
+        rescaling_metrics = scaling_metrics
+        if apply_factor_metric is not None:
+            rescaling_metrics = apply_factor_metric
+        for curr_metric in rescaling_metrics:
+            apply_factor_to_metric(df, curr_metric, apply_factor)
+
+    # Compute ECVF values from ICVF in dataframe
+    if compute_ecvf:
+        df = compute_ecvf_from_df(df)
+
+    # Split Sid columns into Sid and Session columns
+    if longitudinal:
+        columns.insert(4, 'Session')
+        parts = split_unique(df['sid'], longitudinal, n=1).reindex(
+            columns=[0, 1])
+        df['sid'] = parts[0]
+        df['Session'] = parts[1]
+
+        if 'lesion_label' in df.columns.tolist():
+            columns.insert(6, 'lesion_label')
+
+    # Reorder columns and extract average and profile data
+    if 'lesion_label' in df.columns.tolist() and longitudinal is None:
+        columns.insert(5, 'lesion_label')
+
+    df = df[columns]
+    df = df.rename(columns=columns_rename)
+    if qc_exclusions is not None:
+        df = anti_join(df, qc_exclusions)
+    return extract_average_and_profile(df)
+
+
 # Used for imeka dataframe
 def prepare_df_for_plots(df):
     """
@@ -378,29 +658,33 @@ def pivot_to_wide(df, pivot_index, pivot_columns, pivot_value,
     return df
 
 
-def add_average_from_longitudinal(df, column, label):
+def add_average_from_longitudinal(df, column, label, value_column='Value',
+                                  keys=None):
     """ 
     Function to add the average values of a dataframe from a longitudinal 
     dataframe (i.e. average all values over time).
 
-    df :        Dataframe
-    column :    Column name. Column on which average values are calculated.
-    label:      Name of the label to be associated with the average value, 
-                generally 'Average' is used.
+    df :            Dataframe
+    column :        Column name. Column on which average values are calculated.
+    label:          Name of the label to be associated with the average value, 
+                    generally 'Average' is used.
+    value_column:   Column of the values to average.
+    keys:           Columns identifying the averaged rows.
+                    Default: all columns except column and value_column.
     
     Return     Dataframe with average values added.
 
     """
-    # Extract column names
-    col_list = df.columns.tolist()
-    # Remove column of interest from list
-    col_list.remove(column)
-    # Compute mean from dataframe based on column list and Value
-    df_mean = df.groupby(col_list[0:-1])['Value'].mean().reset_index()
-    # Add column name
+    if keys is None:
+        keys = [curr for curr in df.columns
+                if curr not in [column, value_column]]
+    df_mean = df.groupby(keys)[value_column].mean().reset_index()
     df_mean[column] = label
-    # Merge dataframes and reorder columns
-    df_merge = pd.concat([df, df_mean]).reset_index()
-    df_merge = df_merge[df.columns.tolist()]
-    
-    return df_merge
\ No newline at end of file
+    df_mean = df_mean.reindex(columns=df.columns)
+
+    # Append the average rows column by column, each column keeps its
+    # dtype (or the common dtype with the label). Only the output is
+    # allocated, the peak memory is set by the groupby.
+    merged = {curr: pd.concat([df[curr], df_mean[curr]], ignore_index=True)
+              for curr in df.columns}
+    return pd.DataFrame(merged, columns=df.columns, copy=False)
\ No newline at end of file
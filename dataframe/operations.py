@@ -6,41 +6,23 @@ Set of functions used to do operation on dataframe.
 """
 
 from collections import OrderedDict
+import os
 
 import pandas as pd
 import numpy as np
 
+from dataframe.operations_registry import OPERATIONS
+from dataframe.utils import split_unique
+
+
+# Reducers of the aggregate operation (names of pandas groupby.agg).
+AGG_REDUCERS = ['mean', 'sum', 'std', 'count', 'median']
+
 
 def get_df_ops():
     """Get a dictionary of all functions relating to dataframe operations"""
-    return OrderedDict([
-        ('display', display),
-        ('column', list_column),
-        ('unique', unique),
-        ('info', info),
-        ('check_empty', check_empty),
-        ('drop_empty_column', drop_empty_column),
-        ('drop_nan', drop_nan),
-        ('remove_column', remove_column),
-        ('rename', rename),
-        ('delete', delete),
-        ('convert', convert),
-        ('upper', upper),
-        ('lower', lower),
-        ('exclude', exclude),
-        ('select', select),
-        ('get_from', get_from),
-        ('get_where', get_where),
-        ('remove_row', remove_row),
-        ('average', average_on),
-        ('sum', sum_on),
-        ('replace', replace),
-        ('replace_where', replace_where),
-        ('split_col', split_col),
-        ('split_by', split_by),
-        ('factor', apply_factor),
-        ('query', get_query),
-        ('merged', merged_on)])
+    return OrderedDict((name, globals()[operation.function])
+                       for name, operation in OPERATIONS.items())
 
 
 def get_operations_doc(ops: dict):
@@ -65,22 +47,50 @@ def _validate_length_column(column_list, length, min_length=False):
                              'column(s).'.format(length))
 
 
-def _validate_type(dtype1: type, dtype2: type, convert=False):
-    """Make sure that the inputs are in the same type."""
-    if dtype1 != dtype2:
-        raise ValueError('Type of your value not correspond to the column '
-                         'dtype.')
-
-
-def _convert_to_str(df):
-    """Lists original column type and converts all non-float columns to
-    structure to enable actions.
-    Function written to deal with argparser strings.
-    """
-    original_type = df.dtypes.apply(lambda x: x.name).to_dict()
-    to_convert = df.columns[(df.dtypes.values != np.dtype('float64'))]
-    df[to_convert] = df[to_convert].astype(str)
-    return original_type, df
+def _get_dtypes(df):
+    """Return a dictionary of the dtype name of each column."""
+    return df.dtypes.apply(lambda x: x.name).to_dict()
+
+
+def _coerce_value(column, value):
+    """Convert a value given as string (argparse, json) to the dtype of a
+    column, to compare it with the column without converting the column.
+    Lists are converted element by element. Values that can't be converted
+    are returned unchanged (and match nothing)."""
+    if isinstance(value, (list, tuple, set)):
+        return [_coerce_value(column, curr) for curr in value]
+
+    dtype = column.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        if isinstance(value, str):
+            return value.strip().lower() in ['true', '1']
+        return bool(value)
+    if pd.api.types.is_numeric_dtype(dtype):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return value
+        if pd.api.types.is_integer_dtype(dtype) and value.is_integer():
+            return int(value)
+        return value
+    # Object columns are compared as strings
+    return value if isinstance(value, str) else str(value)
+
+
+def _coerce_dict(column, args_dict):
+    """Convert the keys and values of an {old: new} dict to the dtype of a
+    column."""
+    return {_coerce_value(column, key): _coerce_value(column, val)
+            for key, val in args_dict.items()}
+
+
+def _match(column, value):
+    """Return the mask of the rows of a column equal to value (or in value
+    if it is a list), value is converted to the dtype of the column."""
+    value = _coerce_value(column, value)
+    if isinstance(value, list):
+        return column.isin(value)
+    return column == value
 
 
 def _build_query(args_dict, operator, operator_value='=='):
@@ -111,12 +121,34 @@ def list_column(df):
     return print(df.columns.tolist())
 
 
+def null_profile(df):
+    """Count the null values of each column, isnull() is computed once on
+    the whole frame (or on each chunk of an iterable of dataframes, ex.
+    pd.read_csv(chunksize=...), only the columns read are profiled).
+    Returns a dataframe indexed by column with Null_count and
+    Null_percent."""
+    chunks = [df] if isinstance(df, pd.DataFrame) else df
+    counts, n_rows = None, 0
+    for chunk in chunks:
+        chunk_counts = chunk.isnull().sum()
+        counts = chunk_counts if counts is None else counts.add(
+            chunk_counts, fill_value=0)
+        n_rows += len(chunk)
+    if counts is None:
+        counts = pd.Series(dtype='int64')
+
+    profile = pd.DataFrame({'Null_count': counts.astype('int64')})
+    profile['Null_percent'] = profile['Null_count'] / max(n_rows, 1) * 100
+    return profile
+
+
 def info(df):
     """
     info:               DF
                         Print summary informations of DataFrame.
     """
-    return print(df.info())
+    df.info(show_counts=False)
+    return print(null_profile(df))
 
 
 def check_empty(df):
@@ -124,14 +156,12 @@ def check_empty(df):
     check_empty:        DF
                         Check and return a list of column with Nan value.
     """
-    empty_col = []
-    for column in df:
-        if df[column].isnull().any():
-            print('{} has {} ({}%) null values'.format(
-                                column, df[column].isnull().sum(),
-                                df[column].isnull().sum()/len(df)*100))
-            empty_col.append(column)
-    return empty_col
+    profile = null_profile(df)
+    profile = profile[profile['Null_count'] > 0]
+    for column, count, percent in zip(profile.index, profile['Null_count'],
+                                      profile['Null_percent']):
+        print('{} has {} ({}%) null values'.format(column, count, percent))
+    return profile.index.tolist()
 
 
 def drop_empty_column(df):
@@ -151,7 +181,9 @@ def drop_nan(df):
                         Remove all columns and rows with NaN values.
 
     """
-    df_nona = df.drop(df.columns[df.isnull().sum()>len(df.columns)],axis = 1)
+    profile = null_profile(df)
+    df_nona = df.drop(profile.index[profile['Null_count'] > len(df.columns)],
+                      axis=1)
     df_nona = df_nona.dropna(axis = 0, how='any').reset_index(drop=True)
     return df_nona
 
@@ -210,24 +242,51 @@ def delete(df, args_dict: dict()):
     delete:         DF DICT
                     Usage : --my_dict
 
-                    Remove rows based on combination of 2 or 3 arguments.
+                    Remove rows matching all arguments combined, values
+                    can be lists (rows matching one of the values).
                     my_dict Measures=FA Sid=sub-002
+                    my_dict Measures=FA,MD Sid=sub-002,sub-004 Section=1
+                    Lists of more than 2 values are given with --param.
     """
-    original_dtype, df = _convert_to_str(df)
-    zargs = list(args_dict.items())
+    if len(args_dict) == 0:
+        raise ValueError('This function takes at least 1 argument.')
+
+    mask = np.ones(len(df), dtype=bool)
+    for column_name, value in args_dict.items():
+        mask &= _match(df[column_name], value).values
+
+    return df[~mask].reset_index(drop=True)
 
-    if len(zargs) > 3 or len(zargs) == 1:
-        raise ValueError('This function takes only 2 or 3 arguments combined.')
-    elif len(zargs) == 3:
-        tmp = df[(df[zargs[0][0]] == zargs[0][1]) &
-                (df[zargs[1][0]] == zargs[1][1]) &
-                (df[zargs[2][0]] == zargs[2][1])]
-    elif len(zargs) == 2:
-        tmp = df[(df[zargs[0][0]] == zargs[0][1]) &
-                (df[zargs[1][0]] == zargs[1][1])]
 
-    df = df.drop(tmp.index, axis=0).reset_index(drop=True).astype(original_dtype)
-    return  df
+def _rows_in_table(df, table):
+    """Return the mask of the rows of df whose values, in the columns of
+    table, are a row of table. Values of table are converted to the dtype
+    of the columns of df."""
+    missing = [column for column in table.columns if column not in df]
+    if missing:
+        raise ValueError('Column(s) {} not found.'.format(', '.join(missing)))
+
+    keys = pd.MultiIndex.from_arrays(
+        [[_coerce_value(df[column], curr) for curr in table[column]]
+         for column in table.columns])
+    return pd.MultiIndex.from_arrays(
+        [df[column] for column in table.columns]).isin(keys)
+
+
+def delete_table(df, table):
+    """
+    delete_table:   DF TABLE
+                    Usage : --pattern
+
+                    Remove rows listed in a CSV table (--pattern), the
+                    header gives the columns compared. A row is removed
+                    if it matches all the columns of one row of the table.
+                    Ex.: table of QC-failed Sid,Bundles pairs.
+
+    """
+    if not isinstance(table, pd.DataFrame):
+        table = pd.read_csv(table, dtype=str)
+    return df[~_rows_in_table(df, table)].reset_index(drop=True)
 
 
 # Deal like this for now, need to improve it with 'int' arguments
@@ -244,14 +303,19 @@ def convert(df, colunm_name, args_type=None, param=False):
 
     """
     _validate_length_column([colunm_name], 1, min_length=True)
-    original_dtype, _ = _convert_to_str(df)
 
+    # Only the columns whose dtype changes are converted
+    new_dtype = {}
     if param:
-        original_dtype = param
+        new_dtype = param
     elif args_type:
-        original_dtype[colunm_name[0]] = args_type
+        new_dtype = {colunm_name[0]: args_type}
 
-    df = df.astype(original_dtype)
+    original_dtype = _get_dtypes(df)
+    new_dtype = {column: dtype for column, dtype in new_dtype.items()
+                 if original_dtype.get(column) != dtype}
+    if new_dtype:
+        df = df.astype(new_dtype)
     return df
 
 
@@ -264,7 +328,7 @@ def lower(df, column_name: str, threshold):
 
     """
     _validate_length_column([column_name], 1)
-    _validate_type(df[column_name].values.dtype, type(threshold))
+    threshold = _coerce_value(df[column_name], threshold)
     return df[df[column_name] > threshold].reset_index(drop=True)
 
 
@@ -277,7 +341,7 @@ def upper(df, column_name: str, threshold):
 
     """
     _validate_length_column([column_name], 1)
-    _validate_type(df[column_name].dtype, type(threshold))
+    threshold = _coerce_value(df[column_name], threshold)
     return df[df[column_name] < threshold].reset_index(drop=True)
 
 
@@ -290,7 +354,7 @@ def exclude(df, column_name: str, threshold):
 
     """
     _validate_length_column([column_name], 1)
-    _validate_type(df[column_name].dtype, type(threshold))
+    threshold = _coerce_value(df[column_name], threshold)
     return df[df[column_name] != threshold].reset_index(drop=True)
 
 
@@ -304,7 +368,7 @@ def select(df, column_name: str, threshold):
 
     """
     _validate_length_column([column_name], 1)
-    _validate_type(df[column_name].dtype, type(threshold))
+    threshold = _coerce_value(df[column_name], threshold)
     return df[df[column_name] == threshold].reset_index(drop=True)
 
 
@@ -314,15 +378,11 @@ def average_on(df, column_list: list):
                     Usage : --my_cols
 
                     Average the values in numeric column according to the 
-                    columns in the list.
+                    columns in the list. NaN values are skipped.
                     COLUMNS_LIST = [COLUMN_NAME(S), NUMERIC_COLUMN]
 
     """
-    _validate_length_column([column_list[-1]], 1)
-    _validate_length_column(column_list[:-1], 1, min_length=True)
-    if len(check_empty(df)) > 0:
-        raise ValueError('Remove column(s) with NaN value.')
-    return df.groupby(column_list[:-1])[column_list[-1]].mean().reset_index()
+    return aggregate(df, column_list, 'mean')
 
 
 def sum_on(df, column_list: list):
@@ -332,14 +392,83 @@ def sum_on(df, column_list: list):
 
                 Sum the values in numeric column according to the columns
                 in the list. Design to sum volume or count for example.
+                NaN values are skipped.
                 COLUMNS_LIST = [COLUMN_NAME(S), NUMERIC_COLUMN]
 
+    """
+    return aggregate(df, column_list, 'sum')
+
+
+def aggregate(df, column_list: list, reducers='mean', reducer_dict=None):
+    """
+    aggregate:      DF COLUMNS_LIST PATTERN [DICT optional]
+                    Usage : --my_cols --pattern --my_dict
+
+                    Group the data on the columns in the list and reduce the
+                    numeric column, all reducers are computed in one pass.
+                    NaN values are skipped.
+                    COLUMNS_LIST = [COLUMN_NAME(S), NUMERIC_COLUMN]
+
+                    PATTERN: Reducer(s) among mean, sum, std, count and
+                             median, separated by commas. With several
+                             reducers, one column by reducer is saved
+                             (NUMERIC_COLUMN_reducer).
+
+                    DICT: Reducer by value of a grouped column, in the form
+                          COLUMN:VALUE=reducer. Other rows use PATTERN
+                          (single reducer).
+                          Ex.: --pattern mean --my_dict Method:Streamlines=sum
+
     """
     _validate_length_column([column_list[-1]], 1)
     _validate_length_column(column_list[:-1], 1, min_length=True)
-    if len(check_empty(df)) > 0:
-        raise ValueError('Remove column(s) with NaN value.')
-    return df.groupby(column_list[:-1])[column_list[-1]].sum().reset_index()
+    group_cols, value = list(column_list[:-1]), column_list[-1]
+
+    if isinstance(reducers, str):
+        reducers = [curr.strip() for curr in reducers.split(',')]
+    unknown = [str(curr) for curr in reducers if curr not in AGG_REDUCERS]
+    if unknown:
+        raise ValueError('Unknown reducer(s) {}, choose among {}.'.format(
+            ', '.join(unknown), ', '.join(AGG_REDUCERS)))
+
+    selectors = []
+    for key, reducer in (reducer_dict or {}).items():
+        column, _, selected = key.partition(':')
+        if not column or not selected:
+            raise ValueError('Keys of DICT must be COLUMN:VALUE, got '
+                             '{}.'.format(key))
+        if column not in group_cols:
+            raise ValueError('{} is not a grouped column.'.format(column))
+        if not isinstance(reducer, str) or reducer not in AGG_REDUCERS:
+            raise ValueError('{} requires a single reducer among {}, got '
+                             '{}.'.format(key, ', '.join(AGG_REDUCERS),
+                                          reducer))
+        selectors.append((column, selected, reducer))
+
+    used = list(OrderedDict.fromkeys(
+        reducers + [reducer for _, _, reducer in selectors]))
+    if selectors and len(reducers) > 1:
+        raise ValueError('Reducers by value (DICT) require a single default '
+                         'reducer.')
+
+    result = df.groupby(group_cols)[value].agg(used).reset_index()
+    if not selectors:
+        if len(reducers) == 1:
+            return result.rename(columns={reducers[0]: value})
+        return result.rename(columns={curr: value + '_' + curr
+                                      for curr in reducers})
+
+    # Pick the reducer of each group
+    chosen = np.full(len(result), reducers[0], dtype=object)
+    for column, selected, reducer in selectors:
+        chosen[_match(result[column], selected).values] = reducer
+    values = np.empty(len(result))
+    for reducer in used:
+        mask = chosen == reducer
+        values[mask] = result[reducer].values[mask]
+    result = result.drop(columns=used)
+    result[value] = values
+    return result
 
 
 def split_col(df, column_list: list, row_args):
@@ -355,13 +484,14 @@ def split_col(df, column_list: list, row_args):
                     be assigned with numbers.
 
     """
-    _validate_length_column([column_list], 1, min_length=True)
-    if len([column_list]) == 1:
-        df = pd.concat([df, df[column_list[0]].str.split(row_args,
-                                                      expand=True)], axis=1)
-    else:
-        df[column_list[1:]] = df[column_list[0]].str.split(row_args,
-                                                           expand=True)
+    _validate_length_column(column_list, 1, min_length=True)
+    parts = split_unique(df[column_list[0]], row_args)
+    new_columns = column_list[1:] or parts.columns.tolist()
+    if len(new_columns) != parts.shape[1]:
+        raise ValueError('{} is split into {} columns, {} names given.'.format(
+            column_list[0], parts.shape[1], len(new_columns)))
+    for name, curr in zip(new_columns, parts.columns):
+        df[name] = parts[curr]
     return df
 
 
@@ -393,8 +523,8 @@ def replace(df, column_name: str, args_dict: dict()):
 
     """
     _validate_length_column([column_name], 1)
-    original_dtype, df = _convert_to_str(df)
-    df = df.replace({column_name[0]: args_dict}).astype(original_dtype)
+    column = df[column_name[0]]
+    df[column_name[0]] = column.replace(_coerce_dict(column, args_dict))
     return df
 
 
@@ -413,15 +543,54 @@ def replace_where(df, column_list: str, pattern: str, args_dict: dict()):
 
     """
     _validate_length_column(column_list, 2)
-    original_dtype, df = _convert_to_str(df)
-    for key, val in args_dict.items():
-        df.loc[((df[column_list[0]] == pattern) & 
-                (df[column_list[1]] == key)), column_list[1]] = val
-        
-    df = df.astype(original_dtype)
+    selected = _match(df[column_list[0]], pattern)
+    if selected.any():
+        column = df.loc[selected, column_list[1]]
+        df.loc[selected, column_list[1]] = column.replace(
+            _coerce_dict(column, args_dict))
     return df
 
 
+def replace_where_table(df, column_list: list, table):
+    """
+    replace_where_table:    DF COLUMN_LIST TABLE
+                            Usage : --my_cols --pattern
+
+                            Same as replace_where for many patterns at once,
+                            using a CSV table (--pattern) of 3 columns,
+                            without header : pattern, old value, new value.
+                            COLUMN_LIST = [COLUMN_select, COLUMN_replace]
+
+                            Ex.: ['Sid', 'Session'] sessions.csv with rows
+                                 sub-003-hc,2,1
+
+    """
+    _validate_length_column(column_list, 2)
+    if not isinstance(table, pd.DataFrame):
+        table = pd.read_csv(table, dtype=str, header=None,
+                            keep_default_na=False)
+    if table.shape[1] != 3:
+        raise ValueError('The table must have 3 columns : pattern, old value '
+                         'and new value.')
+
+    select, column = df[column_list[0]], df[column_list[1]]
+    patterns = [_coerce_value(select, curr) for curr in table.iloc[:, 0]]
+    old = [_coerce_value(column, curr) for curr in table.iloc[:, 1]]
+    new = np.array([_coerce_value(column, curr) for curr in table.iloc[:, 2]],
+                   dtype=object)
+
+    # Last row is used for duplicated (pattern, old value)
+    keys = pd.MultiIndex.from_arrays([patterns, old])
+    keep = ~keys.duplicated(keep='last')
+    keys, new = keys[keep], new[keep]
+
+    rows = keys.get_indexer(pd.MultiIndex.from_arrays([select, column]))
+    found = rows >= 0
+    if found.any():
+        df.loc[found, column_list[1]] = pd.Series(
+            new[rows[found]], index=df.index[found]).astype(column.dtype)
+    return df
+
 
 def apply_factor(df, column_list: list, row_arg, factor):
     """
@@ -454,8 +623,10 @@ def get_where(df, column_name: str, string_arg: str):
 
     """
     _validate_length_column([column_name], 1)
-    return df.loc[df[column_name].str.contains(string_arg)
-                  ].reset_index(drop=True)
+    column = df[column_name]
+    # Non string columns (ex. a chunk of numbers) are matched as strings
+    mask = column.astype(str).str.contains(string_arg) & column.notna()
+    return df.loc[mask].reset_index(drop=True)
 
 
 def get_from(df, column_name: str, row_args):
@@ -468,7 +639,7 @@ def get_from(df, column_name: str, row_args):
 
     """
     _validate_length_column([column_name], 1)
-    return df.loc[df[column_name].isin([row_args])].reset_index(drop=True)
+    return df.loc[_match(df[column_name], row_args)].reset_index(drop=True)
 
 
 def get_query(df, args_dict: dict(), remove=False, op_if_value=None):
@@ -538,9 +709,6 @@ def merged_on(df, column_list: list, args_dict: dict, volume=False):
     """
     _validate_length_column(column_list[1:-1], 1, min_length=True)
 
-    if len(check_empty(df)) > 0:
-        raise ValueError('Remove column(s) with NaN value.')
-
     df[column_list[0]] = df[column_list[0]].replace(args_dict, regex=True)
 
     if volume:
@@ -549,6 +717,41 @@ def merged_on(df, column_list: list, args_dict: dict, volume=False):
         return average_on(df, column_list)
 
 
+def stream_operation(chunks, operation, op_args, out_csv):
+    """
+    Apply a row filter operation (lower, upper, exclude, select, get_where,
+    get_from) on each chunk of a csv and append the selected rows to the
+    output csv, the whole csv is never loaded.
+
+    chunks:     Iterable of dataframes (see dataframe.utils.load_df_chunks).
+    operation:  Function of the operation.
+    op_args:    Arguments given after the dataframe.
+    out_csv:    Output csv, written with the header of the first chunk.
+                Rows are written in a temporary file, moved to out_csv
+                only if the operation succeeds on all chunks and selects
+                rows.
+
+    Return      Number of rows written.
+    """
+    n_rows = 0
+    header = True
+    tmp_csv = out_csv + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(tmp_csv, 'w', newline='') as f:
+            for chunk in chunks:
+                selected = operation(chunk, *op_args)
+                if header or len(selected):
+                    selected.to_csv(f, index=False, header=header)
+                    header = False
+                n_rows += len(selected)
+        if n_rows:
+            os.replace(tmp_csv, out_csv)
+    finally:
+        if os.path.exists(tmp_csv):
+            os.remove(tmp_csv)
+    return n_rows
+
+
 def merged_col_csv(df1, df2, label1: str, label2: str, colname: str):
     """
     Merged two dataframe based on column. Not used new, will see
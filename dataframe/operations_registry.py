@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Table of the dataframe operations used by df_operations.py. The name,
+implementation and signature of each operation are declared here without
+importing pandas : parsing the arguments and printing --help don't load
+dataframe/operations.py, its functions are loaded when an operation is run.
+
+Signatures (arguments given after the dataframe) :
+    print               Nothing, the operation prints its result.
+    df                  Nothing.
+    dict                --my_dict
+    pattern             --pattern
+    column              --my_cols (first column)
+    column_pattern      --my_cols (first column) --pattern
+    column_value        --my_cols (first column) --value
+    columns             --my_cols
+    columns_pattern     --my_cols --pattern
+    columns_dict        --my_cols --my_dict
+    columns_pattern_dict    --my_cols --pattern --my_dict
+    columns_pattern_optional_dict   --my_cols --pattern [--my_dict]
+    columns_dict_option     --my_cols --my_dict --option
+    columns_pattern_value   --my_cols --pattern --value
+    query               --my_dict --option --pattern
+"""
+
+import ast
+from collections import namedtuple, OrderedDict
+import importlib
+import os
+
+
+OPERATIONS_MODULE = 'dataframe.operations'
+
+# chunked: the csv can be read by chunks with --chunksize. Print operations
+# receive the iterable of chunks, the others are row filters applied on each
+# chunk (see stream_operation).
+Operation = namedtuple('Operation', ['function', 'signature', 'chunked'],
+                       defaults=[False])
+
+OPERATIONS = OrderedDict([
+        ('display', Operation('display', 'print')),
+        ('column', Operation('list_column', 'print')),
+        ('unique', Operation('unique', 'column')),
+        ('info', Operation('info', 'print')),
+        ('check_empty', Operation('check_empty', 'print', chunked=True)),
+        ('drop_empty_column', Operation('drop_empty_column', 'df')),
+        ('drop_nan', Operation('drop_nan', 'df')),
+        ('remove_column', Operation('remove_column', 'column')),
+        ('rename', Operation('rename', 'dict')),
+        ('delete', Operation('delete', 'dict')),
+        ('delete_table', Operation('delete_table', 'pattern')),
+        ('convert', Operation('convert', 'columns_pattern')),
+        ('upper', Operation('upper', 'column_value', chunked=True)),
+        ('lower', Operation('lower', 'column_value', chunked=True)),
+        ('exclude', Operation('exclude', 'column_value', chunked=True)),
+        ('select', Operation('select', 'column_value', chunked=True)),
+        ('get_from', Operation('get_from', 'column_pattern',
+                                  chunked=True)),
+        ('get_where', Operation('get_where', 'column_pattern',
+                                  chunked=True)),
+        ('remove_row', Operation('remove_row', 'column_pattern')),
+        ('average', Operation('average_on', 'columns')),
+        ('sum', Operation('sum_on', 'columns')),
+        ('aggregate', Operation('aggregate', 'columns_pattern_optional_dict')),
+        ('replace', Operation('replace', 'columns_dict')),
+        ('replace_where', Operation('replace_where', 'columns_pattern_dict')),
+        ('replace_where_table', Operation('replace_where_table',
+                                          'columns_pattern')),
+        ('split_col', Operation('split_col', 'columns_pattern')),
+        ('split_by', Operation('split_by', 'column')),
+        ('factor', Operation('apply_factor', 'columns_pattern_value')),
+        ('query', Operation('get_query', 'query')),
+        ('merged', Operation('merged_on', 'columns_dict_option'))])
+
+
+def load_operation(name):
+    """
+    Return the function implementing an operation, dataframe/operations.py
+    is imported on the first call.
+
+    name:   Name of the operation (key of OPERATIONS).
+    """
+    if name not in OPERATIONS:
+        raise ValueError('Operation {} not implement.'.format(name))
+    module = importlib.import_module(OPERATIONS_MODULE)
+    return getattr(module, OPERATIONS[name].function)
+
+
+def get_operations_doc(names=None):
+    """
+    Join the documentation of the operations, read from the source of
+    dataframe/operations.py without importing it.
+
+    names:  List of operation names. Default: all operations.
+    """
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'operations.py')
+    with open(filename) as f:
+        tree = ast.parse(f.read(), filename)
+    docs = {node.name: ast.get_docstring(node, clean=False)
+            for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+    full_doc = []
+    for name in names or OPERATIONS.keys():
+        full_doc.append(docs.get(OPERATIONS[name].function) or '')
+    return "".join(full_doc)
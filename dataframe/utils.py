@@ -7,12 +7,53 @@ Set of functions used to manipulate dataframe.
 
 import pandas as pd
 
-def load_df(dataframe_path):
-    df = pd.read_csv(dataframe_path)
+def load_df(dataframe_path, usecols=None):
+    df = pd.read_csv(dataframe_path, usecols=usecols)
     if 'Unnamed: 0' in df.columns.tolist():
         df.drop('Unnamed: 0', axis=1, inplace=True)
     return df
 
+
+def load_df_chunks(dataframe_path, chunksize, usecols=None):
+    """
+    Read a csv by chunks of rows, like load_df.
+
+    dataframe_path:     CSV file.
+    chunksize:          Number of rows of each chunk.
+    usecols:            List of columns to read. Default: all columns.
+
+    Return              Iterator of dataframes.
+    """
+    for chunk in pd.read_csv(dataframe_path, chunksize=chunksize,
+                             usecols=usecols):
+        if 'Unnamed: 0' in chunk.columns.tolist():
+            chunk = chunk.drop('Unnamed: 0', axis=1)
+        yield chunk
+
+
+def split_unique(column, delimiter, n=-1):
+    """
+    Split the strings of a column like Series.str.split(expand=True), but
+    only the unique values are split : the parts are broadcast to the rows
+    with the codes of the values (pd.factorize).
+
+    column:     Series of strings (ex. Sid repeated for all rows).
+    delimiter:  Delimiter or regular expression.
+    n:          Maximum number of splits. Default: all.
+
+    Return      Dataframe of the parts (columns 0..N), with the index of
+                the column. Missing values give NaN parts.
+    """
+    codes, uniques = pd.factorize(column)
+    parts = pd.Series(uniques, dtype=object).str.split(delimiter, n=n,
+                                                       expand=True)
+    # Missing values (code -1) take an extra row of NaN
+    parts = parts.reindex(range(len(uniques) + 1))
+    codes[codes == -1] = len(uniques)
+    parts = parts.take(codes)
+    parts.index = column.index
+    return parts
+
 # Convert json
 def split_col(x, delimiter_arg='.'):
     """
@@ -29,9 +29,9 @@ import pandas as pd
 import numpy as np
 
 from dataframe.parameters import column_dict_name
-from dataframe.func import (split_col, reshape_to_wide_format,
-                            convert_lesion_data)
-from scilpy.io.utils import (add_overwrite_arg,
+from dataframe.func import (convert_json_to_long_df, reshape_to_wide_format,
+                            save_json_long_csv)
+from common.io_utils import (add_overwrite_arg,
                              assert_inputs_exist, assert_outputs_exist)
 
 
@@ -54,6 +54,10 @@ def _build_arg_parser():
                    help='Save all jsons into a single dataframe in long \n'
                    'format. By default, each json is saved in an '
                    'independent csv. ')
+    p.add_argument('--chunksize', type=int, default=100000,
+                   help='Number of keys of lesion jsons converted and '
+                        'written at once,\nwhen each json is saved in long '
+                        'format. [%(default)s]')
 
     add_overwrite_arg(p)
 
@@ -82,36 +86,23 @@ def main():
             args.out_csv = key_columns
 
         # Load json data
-        df = pd.json_normalize(json.load(open(curr_json))).T
-        df = df.reset_index(drop=False)
+        json_data = json.load(open(curr_json))
+        if not (args.save_merge_df or args.wide):
+            save_json_long_csv(json_data, key_columns,
+                               os.path.join(args.out_dir,
+                                            args.out_csv + '_long.csv'),
+                               chunksize=args.chunksize)
+            continue
 
-        print(df)
-
-        if 'lesion' in curr_json:
-            long_columns_list = column_dict_name[key_columns][0]
-            long_columns_nolist = column_dict_name[key_columns + '_nolist'][0]
-
-            long_df = convert_lesion_data(df, long_columns_list,
-                                          long_columns_nolist)
-
-        else:
-            # Define the column names based on number of columns
-            # This assumes that columns always have the same organization
-            long_columns, wide_columns = column_dict_name[key_columns]
-            # Store json data in dataframe
-            values = [split_col(x) for x in df[["index", 0]].values]
-            print(long_columns, wide_columns)
-            long_df = pd.DataFrame(columns=long_columns, data=values)
+        long_df = convert_json_to_long_df(json_data, key_columns)
+        wide_columns = column_dict_name[key_columns][1]
 
         if args.save_merge_df:
             tmp_df.append(long_df)
 
         else:
             long_df.to_csv(os.path.join(args.out_dir,
-                                        args.out_csv + '_long.csv',
-                                        index=False))
-            long_df.to_csv(os.path.join(args.out_dir,
-                                        args.out_csv + '_wide.csv'),
+                                        args.out_csv + '_long.csv'),
                            index=False)
         # Reshape long to wide dataframe
         if args.wide:
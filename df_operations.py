@@ -32,13 +32,15 @@ import json
 import logging
 import os
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
-from dataframe.utils import load_df
-from dataframe.operations import get_df_ops, get_operations_doc
+from common.io_utils import add_overwrite_arg, assert_inputs_exist
+from common.lazy import lazy_import
+from dataframe.operations_registry import (OPERATIONS, get_operations_doc,
+                                           load_operation)
 
-OPERATIONS = get_df_ops()
+df_ops = lazy_import('dataframe.operations')
+df_utils = lazy_import('dataframe.utils')
 
-__doc__ += get_operations_doc(OPERATIONS)
+__doc__ += get_operations_doc()
 
 
 class ParseDictArgs(argparse.Action):
@@ -87,6 +89,13 @@ def _build_arg_parser():
                    help='Value used for numeric operations on rows.')
     p.add_argument('--option', action='store_true',
                    help='Use for additional options depending on operation.')
+    p.add_argument('--chunksize', type=int,
+                   help='Read the csv by chunks of N rows, for operations '
+                        'supporting it\n(check_empty, lower, upper, exclude, '
+                        'select, get_where, get_from).\nFilters write the '
+                        'selected rows chunk by chunk.')
+    p.add_argument('--usecols', nargs='+',
+                   help='Only read (and save) these columns of the csv.')
     p.add_argument('--out_dir',
                    help='Output directory to save CSV files. ')
 
@@ -110,16 +119,42 @@ def main():
     if args.param:
         input_param = json.load(open(args.param))
 
-
-    df = load_df(args.in_csv)
+    signature = OPERATIONS[args.operation].signature
+    if signature in ['dict', 'columns_dict', 'columns_pattern_dict',
+                     'columns_pattern_optional_dict', 'columns_dict_option',
+                     'query'] and args.param:
+        args.my_dict = input_param
+
+    # Check the arguments before loading the dataframe
+    if signature == 'dict' and not args.my_dict:
+        parser.error('This operation must be used with --my_dict.')
+    if signature.startswith('column') and not args.my_cols:
+        parser.error('This operation must be used with --my_cols.')
+    if 'pattern' in signature and not args.pattern:
+        parser.error('This operation must be used with --pattern.')
+    if 'value' in signature and not args.value:
+        parser.error('Value operations must be used with --value.')
+    if signature in ['columns_dict', 'columns_pattern_dict',
+                     'columns_dict_option', 'query'] and not args.my_dict:
+        parser.error('This operation must be used with --my_dict or '
+                     '--param.')
+
+    operation = load_operation(args.operation)
+    chunked = bool(args.chunksize) and OPERATIONS[args.operation].chunked
+    if chunked:
+        df = df_utils.load_df_chunks(args.in_csv, args.chunksize,
+                                     usecols=args.usecols)
+    else:
+        if args.chunksize:
+            print('{} does not support --chunksize, the csv is loaded at '
+                  'once.'.format(args.operation))
+        df = df_utils.load_df(args.in_csv, usecols=args.usecols)
     result_df = []
-    operations_args = []
 
     # Operations requires only dataframe
-    print_function = ['display', 'column', 'info', 'check_empty']
-    if args.operation in print_function:
+    if signature == 'print':
         try:
-            OPERATIONS[args.operation](df)
+            operation(df)
         except ValueError as msg:
             logging.error('{} operation failed.'.format(
                     args.operation.capitalize()))
@@ -127,99 +162,45 @@ def main():
             return
         exit()
 
-    # Operations requires only dataframe and save it
-    single_operations = ['drop_empty_column', 'drop_nan']
-    if args.operation in single_operations:
-        operations_args = [df]
-
-    # Operations requires dataframe and dictionnary
-    operations_on_column_with_dict = ['rename', 'delete']
-    if args.operation in operations_on_column_with_dict:
-        if not args.my_dict:
-            parser.error('This operation must be used with --my_dict.')
-        operations_args = [df, args.my_dict]
-
-    # Single column operations
-    # Operations requires dataframe and single column
-    operations_on_column = ['unique', 'remove_column', 'split_by']
-    if args.operation in operations_on_column:
-        operations_args = [df, str(args.my_cols[0])]
-
-    # Operations requires dataframe, single column and specific pattern
-    operations_on_column_with_pattern = ['get_where', 'get_from', 'remove_row']
-    if args.operation in operations_on_column_with_pattern:
-        if not args.pattern:
-            parser.error('This operation must be used with --pattern.')
-        operations_args = [df, str(args.my_cols[0]), args.pattern]
-
-    # Operations requires dataframe, single column and specific value
-    operations_on_value = ['lower', 'upper', 'exclude', 'select']
-    if args.operation in operations_on_value:
-        if not args.value:
-            parser.error('Value operations must be used with --value.')
-        operations_args = [df, str(args.my_cols[0]), args.value]
-
-    # Multi columns operations
-    # Operations requires dataframe and multi columns
-    operations_on_multi_columns = ['average', 'sum']
-    if args.operation in operations_on_multi_columns:
-        operations_args = [df, args.my_cols]
-
-    # Operations requires dataframe, multi columns and specific pattern
-    operations_on_multi_columns_with_pattern = ['convert', 'split_col'] # 
-    if args.operation in operations_on_multi_columns_with_pattern:
-        if not args.pattern:
-            parser.error('This operation must be used with --pattern.')
-        operations_args = [df, args.my_cols, args.pattern]
-
-    # Operations requires dataframe, multi columns and dictionnary
-    if args.operation == 'replace':
-        if not args.my_cols and not (args.my_dict or args.param):
-            parser.error('Merge operation must be used with --my_cols and '
-                         '--my_dict or --param.')
-        if args.param:
-            args.my_dict = input_param
-        operations_args = [df, args.my_cols, args.my_dict]
-
-    # Operations requires dataframe, multi columns and dictionnary
-    if args.operation == 'replace_where':
-        if not args.my_cols and not (args.my_dict or args.param or args.pattern):
-            parser.error('Merge operation must be used with --my_cols and '
-                         '--my_dict or --param.')
-        if args.param:
-            args.my_dict = input_param
-        operations_args = [df, args.my_cols, args.pattern, args.my_dict]
-
-    # Operations requires dataframe, multi columns and dictionnary with option
-    if args.operation == 'merged':
-        if not args.my_cols and not (args.my_dict or args.param):
-            parser.error('Merge operation must be used with --my_cols and '
-                         '--my_dict or --param.')
-        if args.param:
-            args.my_dict = input_param
-        operations_args = [df, args.my_cols, args.my_dict, args.option]
-
-    # Operations requires dataframe, multi columns, pattern and value
-    if args.operation == 'factor':
-        if not args.my_cols and not args.pattern and not args.value:
-            parser.error('Factor operation must be used with --my_cols and '
-                         '--pattern and --value.')
-        if args.param:
-            args.my_dict = input_param
-        operations_args = [df, args.my_cols, args.pattern, args.value]
-
-    # Operations requires dataframe, dictionnary, pattern and options
-    if args.operation == 'query':
-        if not (args.my_dict or args.param):
-            parser.error('Query operation must be used with --my_dict or '
-                         ' --param.')
-        if args.param:
-            args.my_dict = input_param
-        operations_args = [df, args.my_dict, args.option, args.pattern]
+    # Arguments given after the dataframe, by signature
+    column = str(args.my_cols[0]) if args.my_cols else None
+    signature_args = {
+        'df': [],
+        'dict': [args.my_dict],
+        'pattern': [args.pattern],
+        'column': [column],
+        'column_pattern': [column, args.pattern],
+        'column_value': [column, args.value],
+        'columns': [args.my_cols],
+        'columns_pattern': [args.my_cols, args.pattern],
+        'columns_dict': [args.my_cols, args.my_dict],
+        'columns_pattern_dict': [args.my_cols, args.pattern, args.my_dict],
+        'columns_pattern_optional_dict': [args.my_cols, args.pattern,
+                                          args.my_dict],
+        'columns_dict_option': [args.my_cols, args.my_dict, args.option],
+        'columns_pattern_value': [args.my_cols, args.pattern, args.value],
+        'query': [args.my_dict, args.option, args.pattern]}
+    operations_args = [df] + signature_args[signature]
+
+    # Row filters applied chunk by chunk, rows are written as they come
+    if chunked:
+        try:
+            n_rows = df_ops.stream_operation(df, operation,
+                                             operations_args[1:],
+                                             os.path.join(args.out_dir,
+                                                          args.out_name))
+        except ValueError as msg:
+            logging.error('{} operation failed.'.format(
+                args.operation.capitalize()))
+            logging.error(msg)
+            return
+        if n_rows == 0:
+            raise ValueError('Dataframe is empty.')
+        return
 
     # Called and run operations with specific arguments required
     try:
-        result_df = OPERATIONS[args.operation](*operations_args)
+        result_df = operation(*operations_args)
     except ValueError as msg:
         logging.error('{} operation failed.'.format(
             args.operation.capitalize()))
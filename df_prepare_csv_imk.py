@@ -11,11 +11,17 @@ import os
 import pandas as pd
 import numpy as np
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import add_overwrite_arg, assert_inputs_exist
+from dataframe.func import anti_join, apply_exclusions, load_qc_exclusions
 
 from utils import (list_metrics, list_method, scaling_metrics, measure_dict,
                    columns_rename, replace_bundles_dict)
 
+# Column of the filtering options in the Imeka csv.
+RM_COLUMNS = {'sid': 'sid', 'bundle': 'Bundles', 'measure': 'endpoint',
+              'section': 'Section'}
+
+
 def _build_arg_parser():
     p = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
                                 description=__doc__)
@@ -31,16 +37,32 @@ def _build_arg_parser():
                    help='Use this option if data contains groups. ')
 
     filtering = p.add_argument_group(title = 'Filtering options')
-    filtering.add_argument('--rm_sid',
+    filtering.add_argument('--rm_sid', nargs='+',
                           help='List of subjects to remove. ')
-    filtering.add_argument('--rm_bundle',
+    filtering.add_argument('--rm_bundle', nargs='+',
                           help='List of bundles to remove.')
-    filtering.add_argument('--rm_measure',
+    filtering.add_argument('--rm_measure', nargs='+',
                           help='List of measures to remove. ')
     filtering.add_argument('--rm_stats',
                           help='List of statistics to remove. ')
-    filtering.add_argument('--rm_section', type=int,
+    filtering.add_argument('--rm_section', type=int, nargs='+',
                           help='List of sections to remove. ')
+    filtering.add_argument('--substring_match', nargs='*',
+                          default=['sid', 'bundle', 'measure'],
+                          choices=RM_COLUMNS.keys(),
+                          help='Filtering options (rm_*) matched as '
+                               'substrings, the others\nmust match '
+                               'exactly. [%(default)s]')
+    filtering.add_argument('--rm_qc',
+                          help='AutoQC csv (scil_bundle_autoqc_rdt_wip.py). '
+                               'Bundles of subjects\nwhose QC_global is in '
+                               '--qc_status are removed.')
+    filtering.add_argument('--qc_status', nargs='+', default=['Failed'],
+                          help='QC_global status removed with --rm_qc. '
+                               '[%(default)s]')
+    filtering.add_argument('--qc_by_subject', action='store_true',
+                          help='With --rm_qc, remove all bundles of the '
+                               'listed subjects.')
 
     set_shape = p.add_argument_group(title = 'CSV shape options')
     set_shape.add_argument('--rename_measure', action='store_true',
@@ -65,7 +87,7 @@ def main():
     parser = _build_arg_parser()
     args = parser.parse_args()
 
-    assert_inputs_exist(parser, args.in_csv)
+    assert_inputs_exist(parser, args.in_csv, args.rm_qc)
 
     if args.out_dir is None:
         args.out_dir = './'
@@ -152,21 +174,19 @@ def main():
         df.loc[df.endpoint.isin(metric),'Method']=list_method[idx]
 
     ## Filtering dataframe
-    if args.rm_sid:
-        for subject in args.rm_sid:
-            df = df.loc[~df['sid'].str.contains(subject)]
-
-    if args.rm_bundle:
-        for bundle in args.rm_bundle:
-            df = df.loc[~df['Bundles'].str.contains(bundle)]
-
-    if args.rm_measure:
-        for measure in args.rm_measure:
-            df = df.loc[~df['endpoint'].str.contains(measure)]
-
-    if args.rm_section:
-        for section in args.rm_section:
-            df = df.loc[~df['Section'].str.contains(section)]
+    df = apply_exclusions(df, {RM_COLUMNS['sid']: args.rm_sid,
+                               RM_COLUMNS['bundle']: args.rm_bundle,
+                               RM_COLUMNS['measure']: args.rm_measure,
+                               RM_COLUMNS['section']: args.rm_section},
+                          substring_columns=[RM_COLUMNS[curr] for curr
+                                             in args.substring_match])
+    if args.rm_qc:
+        keys = ['Sid'] if args.qc_by_subject else ['Sid', 'Bundles']
+        qc_exclusions = load_qc_exclusions(args.rm_qc, keys=keys,
+                                           status=args.qc_status)
+        # Columns of the autoQC table are the renamed columns
+        qc_exclusions = qc_exclusions.rename(columns={'Sid': 'sid'})
+        df = anti_join(df, qc_exclusions)
 
     if args.rename_measure:
         # check lists
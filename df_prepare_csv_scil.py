@@ -9,13 +9,12 @@ to build html figures for the Read the Doc site.
 import argparse
 import os
 import pandas as pd
-import numpy as np
 
-from dataframe.parameters import (list_metrics, list_method, scaling_metrics,
-                            measure_dict, replace_dict, columns_rename,
-                            col_order)
-from dataframe.func import (apply_factor_to_metric, filter_df, extract_average_and_profile,
-                            compute_ecvf_from_df, merged_left_right_data)
+from dataframe.func import filter_df, load_qc_exclusions, prepare_scil_df
+
+# Column of the filtering options in the converted csv.
+RM_COLUMNS = {'sid': 'sid', 'bundle': 'roi', 'measure': 'metrics',
+              'section': 'section'}
 
 
 def _build_arg_parser():
@@ -42,6 +41,21 @@ def _build_arg_parser():
     filtering.add_argument('--rm_rbx',
                            choices=["v1", "v10"],
                            help='List of RBX version to remove. ')
+    filtering.add_argument('--substring_match', nargs='*', default=['sid'],
+                           choices=RM_COLUMNS.keys(),
+                           help='Filtering options (rm_*) matched as '
+                                'substrings, the others\nmust match '
+                                'exactly. [%(default)s]')
+    filtering.add_argument('--rm_qc',
+                           help='AutoQC csv (scil_bundle_autoqc_rdt_wip.py). '
+                                'Bundles of subjects\nwhose QC_global is in '
+                                '--qc_status are removed.')
+    filtering.add_argument('--qc_status', nargs='+', default=['Failed'],
+                           help='QC_global status removed with --rm_qc. '
+                                '[%(default)s]')
+    filtering.add_argument('--qc_by_subject', action='store_true',
+                           help='With --rm_qc, remove all bundles of the '
+                                'listed subjects.')
 
     set_shape = p.add_argument_group(title='CSV shape options')
     set_shape.add_argument('--rename_measure', action='store_true',
@@ -56,7 +70,7 @@ def _build_arg_parser():
                                 'column in two columns. [%(default)s].')
     set_shape.add_argument('--split_by_method', action='store_true',
                            help='Rename MRI measures. ')
-    set_shape.add_argument('--apply_factor_metric',
+    set_shape.add_argument('--apply_factor_metric', nargs='+',
                            help='List of metrics where a factor must be '
                                 'applied.\nBy default, is applied on Diffusion '
                                 'Measure (including FW-corrected).')
@@ -82,108 +96,30 @@ def main():
     if args.out_name is None:
         args.out_name = 'rtd_'
 
+    qc_exclusions = None
+    if args.rm_qc:
+        if not os.path.isfile(args.rm_qc):
+            parser.error('Input file {} does not exist'.format(args.rm_qc))
+        keys = ['Sid'] if args.qc_by_subject else ['Sid', 'Bundles']
+        qc_exclusions = load_qc_exclusions(args.rm_qc, keys=keys,
+                                           status=args.qc_status)
+
     # Load Data frame without
     df = pd.read_csv(args.in_csv)
 
-    df.loc[df.metrics.str.contains('length'), 'stats'] = df['metrics']
-    df.loc[df.metrics.str.contains('volume'), 'stats'] = 'volume'
-    df.loc[df.metrics.str.contains('count'), 'stats'] = 'count'
-    df.section = df.section.replace(np.nan, 0, regex=True)
-    df.section = df['section'].astype(int)
-
-    df.loc[df.roi.str.contains('v10'),'rbx_version']= 'v10'
-    df.loc[~df.roi.str.contains('v10'),'rbx_version']= 'v1'
-
-    # Drop index column and rename some pattern from columns
-    for key in replace_dict:
-        df[key] = df[key].replace(replace_dict[key],'', regex=True)
-
-    # Filtering dataframe
-    if args.rm_rbx:
-        df = df.loc[~df['rbx_version'].str.contains(args.rm_rbx)]
-
-    if args.rm_sid:
-        for subject in args.rm_sid:
-            df = df.loc[~df['sid'].str.contains(subject)]
-
-    if args.rm_bundle:
-        for bundle in args.rm_bundle:
-            df = df.loc[~(df.roi == bundle)]
-
-    if args.rm_measure:
-        for measure in args.rm_measure:
-            df = df.loc[~(df.metrics == measure)]
-
-    if args.rm_section:
-        for section in args.rm_section:
-            df = df.loc[~(df.section == section)]
-
-    # Attribute Method corresponding to metrics based on lists
-    for idx, metric in enumerate(list_metrics):
-        df.loc[df.metrics.isin(metric), 'Method'] = list_method[idx]
-
-    # Merge Left and right : remove L and R and mean row
-    if args.merge_lr:
-        df = merged_left_right_data(df, col_order[:-1])
-    else:
-        df['roi'] = df.roi.replace({'_L':'_Left','_R':'_Right'}, regex=True)
-
-    if args.rename_measure:
-        # check lists
-        missing_metric = []
-        for metric_item in df['metrics'].unique():
-            if metric_item not in measure_dict:
-                missing_metric.append(metric_item)
-
-        if len(missing_metric) > 0:
-            print("The listed metrics don't match with the default "
-                  "metrics list.\nYou can add missing metrics in "
-                  " ALL requiring lists in utils.py.\n", missing_metric)
-        else:
-            # Rename measures using a dictionnary
-            df = df.replace({"metrics": measure_dict})
-
-    # Remove the underscore from Bundle name
-    if args.rename_bundles:
-        df['roi'] = df.roi.replace('_', ' ', regex=True)
-
-    # Apply a scale factor for diffusion measure
-    if args.apply_factor:
-        if args.apply_factor_metric is not None:
-            rescaling_metrics = args.apply_factor_metric
-        else:
-            rescaling_metrics = scaling_metrics
-            for curr_metric in rescaling_metrics:
-                apply_factor_to_metric(df, curr_metric, args.apply_factor)
-
-    # Compute ECVF values from ICVF in dataframe
-    if args.compute_ecvf:
-        df = compute_ecvf_from_df(df)
-
-    # Split Sid columns into Sid and Session columns
-    if args.longitudinal:
-        col_order.insert(4, 'Session')
-        df[['tmp','Session']] = df['sid'].str.split(args.longitudinal,
-                                                    n=1, expand=True)
-        df.drop('sid', axis=1, inplace=True)
-        df = df.rename(columns={'tmp':'sid'})
-
-        if 'lesion_label' in df.columns.tolist():
-            col_order.insert(6, 'lesion_label')
-
-        df = df[col_order]
-
-    # Reorder columns and extract average and profile data
-    if 'lesion_label' in df.columns.tolist() and args.longitudinal is None:
-        col_order.insert(5, 'lesion_label')
-
-    df = df[col_order]
-    df = df.rename(columns=columns_rename)
-    average, profile = extract_average_and_profile(df)
+    average, profile = prepare_scil_df(
+        df, rm_rbx=args.rm_rbx, rm_sid=args.rm_sid, rm_bundle=args.rm_bundle,
+        rm_measure=args.rm_measure, rm_section=args.rm_section,
+        merge_lr=args.merge_lr, rename_measure=args.rename_measure,
+        rename_bundles=args.rename_bundles, apply_factor=args.apply_factor,
+        apply_factor_metric=args.apply_factor_metric,
+        compute_ecvf=args.compute_ecvf, longitudinal=args.longitudinal,
+        substring_columns=[RM_COLUMNS[curr] for curr in args.substring_match],
+        qc_exclusions=qc_exclusions)
 
     # Save new dataframes
     if args.split_by_method:
-        for curr_method in average.unique():
+        for curr_method in average['Method'].unique():
             average_by_method = filter_df(average, 'Method', curr_method)
             average_by_method.to_csv(os.path.join(args.out_dir, args.out_name +
                                                   'average_' + curr_method +
@@ -15,7 +15,7 @@ Use the --select_columns option to output only the columns you want. For example
 import argparse
 import os
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import add_overwrite_arg, assert_inputs_exist
 from dataframe.utils import load_df
 from dataframe.func import generate_summary_table
 
@@ -24,8 +24,10 @@ import pandas as pd
 
 from dataframe.func import split_df_by, pivot_to_wide
 from dataframe.utils import load_df
-from plots.utils import save_figures_as
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from plots.utils import (save_figures_as, start_png_session,
+                         close_png_session)
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
+                             assert_inputs_exist)
 from plots.scatter import multi_correlation_with_menu
 
 
@@ -60,6 +62,7 @@ def _build_arg_parser():
     plot.add_argument('--trendline_color', default='black',
                            help='Color of regression line. [%(default)s]')
 
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -74,6 +77,9 @@ def main():
     if args.out_dir is None:
         args.out_dir = './'
 
+    if args.save_as_png:
+        start_png_session()
+
     # Load Data frame
     df = load_df(args.in_csv)
 
@@ -92,7 +98,8 @@ def main():
             outname = curr_name + '_' + args.out_name
 
             save_figures_as(fig, args.out_dir, outname,
-                            save_as_png=args.save_as_png)
+                            save_as_png=args.save_as_png,
+                            shared_plotlyjs=args.shared_plotlyjs)
     else:
         df = df.set_index(df.columns.tolist()[0])
         fig = multi_correlation_with_menu(
@@ -103,7 +110,11 @@ def main():
                     fig_height=args.plot_size[1])
 
         save_figures_as(fig, args.out_dir, args.out_name,
-                        save_as_png=args.save_as_png)
+                        save_as_png=args.save_as_png,
+                        shared_plotlyjs=args.shared_plotlyjs)
+
+    close_png_session()
+
 
 if __name__ == '__main__':
     main()
@@ -16,10 +16,12 @@ rdt_generate_mean_measures_across_bundles_plot.py dti.csv
 import argparse
 import pandas as pd
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
+                             assert_inputs_exist)
 from dataframe.func import split_df_by
 from dataframe.utils import load_df
-from plots.utils import save_figures_as
+from plots.utils import (save_figures_as, start_png_session,
+                         close_png_session)
 from plots.scatter import interactive_distribution_plot
 
 
@@ -69,6 +71,7 @@ def _build_arg_parser():
     scatter.add_argument('--dpi_scale', type=int, default=6,
                          help='Use to increase (>1) or decrease (<1) the '
                               ' image resolution. [%(default)s]')
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -83,6 +86,9 @@ def main():
     if args.out_dir is None:
         args.out_dir = './'
 
+    if args.save_as_png:
+        start_png_session()
+
     # Load and filter Dataframe
     df = load_df(args.in_csv)
 
@@ -113,7 +119,8 @@ def main():
                             save_as_png=args.save_as_png,
                             dpi_scale=args.dpi_scale,
                             heigth_value=args.plot_size[1],
-                            width_value=args.plot_size[0])
+                            width_value=args.plot_size[0],
+                            shared_plotlyjs=args.shared_plotlyjs)
 
     else:
 
@@ -136,7 +143,10 @@ def main():
         save_figures_as(fig, args.out_dir, args.out_name,
                     save_as_png=args.save_as_png, dpi_scale=args.dpi_scale,
                     heigth_value=args.plot_size[1],
-                    width_value=args.plot_size[0])
+                    width_value=args.plot_size[0],
+                    shared_plotlyjs=args.shared_plotlyjs)
+
+    close_png_session()
 
 
 if __name__ == '__main__':
@@ -15,15 +15,19 @@ Warning : Require kaleido to save in png.
 import argparse
 
 import pandas as pd
-import plotly.express as px
 
 from dataframe.func import get_multi_corr_map, get_corr_map
 from dataframe.utils import (get_row_name_from_col, load_df)
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
+                             assert_inputs_exist)
 from plots.parameters import new_order_measure
-from plots.utils import (save_figures_as, generate_reorder_list,
-                         check_agreement_with_dict)
+from plots.utils import (save_figures_as, check_agreement_with_dict,
+                         close_png_session, generate_reorder_list,
+                         start_png_session)
 from plots.heatmap import interactive_heatmap, interactive_heatmap_with_slider
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
 
 
 def _build_arg_parser():
@@ -92,6 +96,7 @@ def _build_arg_parser():
                            help='Y axis title of correlation heatmap. '
                                 '[%(default)s]')
 
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -106,6 +111,9 @@ def main():
     if args.out_dir is None:
         args.out_dir = './'
 
+    if args.save_as_png:
+        start_png_session()
+
     if args.colormap is None:
         args.colormap = px.colors.sequential.YlGnBu
 
@@ -155,7 +163,8 @@ def main():
                 corr_name)
             save_figures_as(fig, args.out_dir, outname,
                             is_slider=args.use_as_slider,
-                            save_as_png=args.save_as_png)
+                            save_as_png=args.save_as_png,
+                            shared_plotlyjs=args.shared_plotlyjs)
 
     # Heatmap with slider
     if args.use_as_slider:
@@ -197,7 +206,10 @@ def main():
     else:
         save_figures_as(fig, args.out_dir, args.out_name,
                         is_slider=args.use_as_slider,
-                        save_as_png=args.save_as_png)
+                        save_as_png=args.save_as_png,
+                        shared_plotlyjs=args.shared_plotlyjs)
+
+    close_png_session()
 
 
 if __name__ == '__main__':
@@ -12,10 +12,12 @@ import pandas as pd
 
 from dataframe.func import split_df_by
 from dataframe.utils import load_df
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
+                             assert_inputs_exist)
 from plots.parameters import dict_plot_profile, metric_colors
-from plots.utils import (check_df_for_columns, check_agreement_with_dict,
-                         save_figures_as)
+from plots.utils import (save_figures_as, check_agreement_with_dict,
+                         check_df_for_columns, close_png_session,
+                         start_png_session)
 from plots.line import interactive_lineplot
 
 def _build_arg_parser():
@@ -68,6 +70,7 @@ def _build_arg_parser():
     scatter.add_argument('--dpi_scale', type=int, default=6,
                          help='Use to increase (>1) or decrease (<1) the '
                               ' image resolution. [%(default)s]')
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -82,6 +85,9 @@ def main():
     if args.out_dir is None:
         args.out_dir = './'
 
+    if args.save_as_png:
+        start_png_session()
+
     # Load and filter Dataframe
     df = load_df(args.in_csv)
 
@@ -121,7 +127,8 @@ def main():
             save_figures_as(fig, args.out_dir, 
                             curr_name + '_' + args.out_name + '.html',
                             is_slider=args.use_as_slider,
-                            save_as_png=args.save_as_png)
+                            save_as_png=args.save_as_png,
+                            shared_plotlyjs=args.shared_plotlyjs)
     else:
         single_method = df['Method'].unique().tolist()[0]
         curr_title = "Profil of " + single_method
@@ -143,8 +150,10 @@ def main():
         save_figures_as(fig, args.out_dir, 
                         args.out_name + '.html',
                         is_slider=args.use_as_slider,
-                        save_as_png=args.save_as_png)
+                        save_as_png=args.save_as_png,
+                        shared_plotlyjs=args.shared_plotlyjs)
 
+    close_png_session()
 
 
 if __name__ == '__main__':
@@ -18,12 +18,13 @@ import argparse
 import os
 
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
-from scilpy.viz.utils import get_colormap
+from common.io_utils import add_overwrite_arg, assert_inputs_exist
+from common.lazy import lazy_import
+
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
 
 
 def _build_arg_parser():
@@ -8,12 +8,13 @@ Script to plot prpfile from CSV ouput from rdt_prepare_csv_for_figures.py.
 import argparse
 import os
 
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
-from scilpy.viz.utils import get_colormap
+from common.io_utils import add_overwrite_arg, assert_inputs_exist
+from common.lazy import lazy_import
+
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
 
 def _build_arg_parser():
     p = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Set of functions used to skip the steps of the site build whose outputs are
+up to date. Each step is recorded in a manifest with a digest of its inputs
+and parameters, the step is skipped when the digest did not change and all
+its outputs exist.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def hash_file(filename, chunk_size=1 << 20):
+    """Return the sha1 digest of the content of a file."""
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _update_digest(digest, obj):
+    """Recursively feed an object to a hashlib digest."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        digest.update(b'df')
+        digest.update(repr(obj.columns.tolist() if isinstance(
+            obj, pd.DataFrame) else obj.name).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).values)
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr((obj.dtype, obj.shape)).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        digest.update(b'dict')
+        for key in sorted(obj, key=repr):
+            _update_digest(digest, key)
+            _update_digest(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'list')
+        for item in obj:
+            _update_digest(digest, item)
+    elif callable(obj) and hasattr(obj, '__qualname__'):
+        digest.update('{}.{}'.format(obj.__module__,
+                                     obj.__qualname__).encode())
+    else:
+        digest.update(repr(obj).encode())
+
+
+def hash_object(*objs):
+    """
+    Return the sha1 digest of objects. Dataframes are hashed from their
+    values, dictionaries independently of the order of their keys and
+    functions from their name.
+    """
+    digest = hashlib.sha1()
+    for obj in objs:
+        _update_digest(digest, obj)
+    return digest.hexdigest()
+
+
+def hash_sources(*objs):
+    """
+    Return the digest of the source files of modules or functions, used to
+    rebuild the outputs when the code or the parameter dicts change.
+    """
+    return hash_object([hash_file(inspect.getsourcefile(obj))
+                        for obj in objs])
+
+
+class BuildCache(object):
+    """
+    Manifest of the steps of a build. Each entry stores the digest of the
+    step and the list of its outputs.
+    """
+    def __init__(self, manifest_path, rebuild=False):
+        """
+        manifest_path:  Json file of the manifest.
+        rebuild:        If True, all steps are considered outdated.
+        """
+        self.manifest_path = manifest_path
+        self.rebuild = rebuild
+        self.steps = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as f:
+                self.steps = json.load(f)
+
+    def is_up_to_date(self, step, digest):
+        """Return True if the step has the same digest and its outputs
+        exist."""
+        entry = self.steps.get(step)
+        if self.rebuild or entry is None or entry['digest'] != digest:
+            return False
+        return all(os.path.isfile(curr) for curr in entry['outputs'])
+
+    def outputs(self, step):
+        """Return the outputs recorded for a step."""
+        return self.steps[step]['outputs']
+
+    def record(self, step, digest, outputs):
+        """Record a step after its outputs have been written."""
+        self.steps[step] = {'digest': digest, 'outputs': list(outputs)}
+
+    def save(self):
+        """Write the manifest."""
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.steps, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Set of functions used to build the Read the Doc site from TractometryFlow
+outputs in a single process. Each step corresponds to a script (or a call of
+df_operations.py) of the former reatdoc_run.sh and works on dataframes kept
+in memory.
+"""
+
+from collections import OrderedDict
+import glob
+import json
+import os
+
+import pandas as pd
+
+from dataframe.func import (convert_json_to_long_df, generate_summary_table,
+                            prepare_scil_df, split_df_by)
+from dataframe.operations import get_df_ops
+from pipeline.cache import hash_object, hash_sources
+import plots.utils
+import rd_boxplot
+import rd_correlation_with_menu
+import rd_distribution_measures
+import rd_heatmap
+import rd_profiles_measures
+
+
+# Name of the merged json (used by column_dict_name) and folder of the
+# individual jsons in each subject folder of TractometryFlow.
+TRACTOMETRY_JSONS = OrderedDict([
+        ('mean_std', 'Bundle_Mean_Std'),
+        ('mean_std_per_point', 'Bundle_Mean_Std_Per_Point'),
+        ('streamline_count', 'Bundle_Streamline_Count'),
+        ('length_stats', 'Bundle_Length_Stats'),
+        ('volume', 'Bundle_Volume'),
+        ('volume_per_label', 'Bundle_Volume_Per_Label')])
+
+# Sub-folders of the output directory.
+SITE_FOLDERS = ['convert_to_csv', 'csv_data', 'bundles', 'tables',
+                'heatmap', 'correlations', 'averages_figures',
+                'distributions', 'profile']
+
+
+def _merge_entries(merged, entries):
+    """Recursively merge the entries of a json into merged."""
+    for key, value in entries.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            _merge_entries(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def merge_json_entries(in_jsons):
+    """
+    Merge several jsons into a single dictionary, like
+    scil_json_merge_entries.py without option.
+
+    in_jsons:   List of json files.
+
+    Return      Dictionary of the merged entries.
+    """
+    merged = {}
+    for curr_json in sorted(in_jsons):
+        with open(curr_json) as f:
+            _merge_entries(merged, json.load(f))
+    return merged
+
+
+def list_tractometry_jsons(in_tractometry):
+    """
+    List the jsons of all subjects output by TractometryFlow.
+
+    in_tractometry:     Path of the TractometryFlow results.
+
+    Return              OrderedDict of sorted lists of jsons named as in
+                        TRACTOMETRY_JSONS. Missing jsons are skipped.
+    """
+    in_jsons = OrderedDict()
+    for key_columns, folder in TRACTOMETRY_JSONS.items():
+        curr_jsons = glob.glob(os.path.join(in_tractometry, '*', folder,
+                                            '*.json'))
+        if len(curr_jsons) == 0:
+            print('No json found for {}, skipped.'.format(folder))
+            continue
+        in_jsons[key_columns] = sorted(curr_jsons)
+    return in_jsons
+
+
+def load_tractometry_jsons(in_tractometry):
+    """
+    Load and merge the jsons of all subjects output by TractometryFlow.
+
+    in_tractometry:     Path of the TractometryFlow results, or the output
+                        of list_tractometry_jsons.
+
+    Return              OrderedDict of merged jsons named as in
+                        TRACTOMETRY_JSONS. Missing jsons are skipped.
+    """
+    in_jsons = in_tractometry
+    if not isinstance(in_tractometry, dict):
+        in_jsons = list_tractometry_jsons(in_tractometry)
+    return OrderedDict((key_columns, merge_json_entries(curr_jsons))
+                       for key_columns, curr_jsons in in_jsons.items())
+
+
+def convert_jsons(merged_jsons):
+    """
+    Convert merged jsons into a single dataframe in long format
+    (see df_convert_json_to_csv.py --save_merge_df).
+
+    merged_jsons:   Dictionary of merged jsons named as in TRACTOMETRY_JSONS.
+
+    Return          Dataframe in long format.
+    """
+    long_dfs = [convert_json_to_long_df(json_data, key_columns)
+                for key_columns, json_data in merged_jsons.items()]
+    return pd.concat(long_dfs, ignore_index=True)
+
+
+def prepare(df, **kwargs):
+    """
+    Reshape the long format dataframe for the figures
+    (see df_prepare_csv_scil.py and prepare_scil_df for kwargs).
+
+    Return  Two dataframes, average and profile data.
+    """
+    return prepare_scil_df(df, **kwargs)
+
+
+def apply_operations(df, operations):
+    """
+    Apply a sequence of df_operations.py operations on a dataframe.
+
+    df:             Dataframe.
+    operations:     List of [operation_name, [arguments]], arguments are
+                    given after the dataframe as in df_operations.py.
+                    Ex.: [['replace_where', [['Sid', 'Session'], 'sub-003',
+                                             {'2': '1'}]]]
+
+    Return          Dataframe.
+    """
+    df_ops = get_df_ops()
+    for operation, op_args in operations:
+        if operation not in df_ops:
+            raise ValueError('Operation {} not implement.'.format(operation))
+        df = df_ops[operation](df, *op_args)
+    return df
+
+
+def split_measures_and_volume(df):
+    """
+    Split prepared data into MRI measures and volume data.
+    Measures : remove volume and std statistics.
+    Volume : select Streamlines method, remove std, min and max statistics.
+
+    df:     Dataframe output by prepare().
+
+    Return  Two dataframes, measures and volume data.
+    """
+    measures = df.loc[~df['Statistics'].isin(['volume', 'std'])]
+    volume = df.loc[(df['Method'] == 'Streamlines') &
+                    ~df['Statistics'].isin(['std', 'min', 'max'])]
+    return measures.reset_index(drop=True), volume.reset_index(drop=True)
+
+
+def split_bundles(df):
+    """
+    Split a dataframe by bundle.
+
+    Return  OrderedDict of dataframes by bundle name.
+    """
+    split_df, split_name = split_df_by(df, 'Bundles')
+    return OrderedDict(zip(split_name, split_df))
+
+
+def summary_table(df, sort_by='Measures'):
+    """
+    Generate the summary table of a dataframe (see df_summary_table.py).
+
+    Return  Summary table.
+    """
+    table = generate_summary_table(df, by_cols=['Measures', 'Value'])
+    if sort_by:
+        table = table.reindex(df[sort_by].unique().tolist())
+    return table
+
+
+def figure_job_output(job):
+    """Return the file written by a FigureJob."""
+    extension = '.html'
+    if job.save_kwargs.get('save_as_png'):
+        extension = '.png'
+    return os.path.join(job.out_path, job.out_name + extension)
+
+
+def figure_job_outputs(job):
+    """
+    Return the files of a FigureJob to record in the build cache : the
+    figure and the shared plotly.js bundle it references, if any.
+    """
+    outputs = [figure_job_output(job)]
+    shared_plotlyjs = job.save_kwargs.get('shared_plotlyjs')
+    if shared_plotlyjs and not job.save_kwargs.get('save_as_png'):
+        outputs.append(os.path.join(job.out_path, shared_plotlyjs))
+    return outputs
+
+
+def get_outdated_figure_jobs(jobs, cache):
+    """
+    Select the figures to render again. A figure is up to date when its
+    plot function, data, options and the source of the plots modules did
+    not change since it was rendered. The dicts of plots/parameters.py are
+    given to the plot functions by the scripts, only the figures using a
+    modified dict are outdated.
+
+    jobs:       List of FigureJob.
+    cache:      BuildCache of the site.
+
+    Return      List of outdated FigureJob and list of their digests.
+    """
+    sources = hash_sources(plots.utils)
+    outdated, digests = [], []
+    for job in jobs:
+        digest = hash_object(sources, hash_sources(job.plot_func),
+                             job.plot_func, job.plot_kwargs, job.save_kwargs)
+        if not cache.is_up_to_date(figure_job_output(job), digest):
+            outdated.append(job)
+            digests.append(digest)
+    return outdated, digests
+
+
+def _get_script_jobs(script, df, script_args):
+    """List the figures of a rd_* script called with script_args."""
+    args = script._build_arg_parser().parse_args(script_args)
+    return script.get_figure_jobs(df.copy(), args)
+
+
+def get_site_figure_jobs(csv_data, bundles, out_dir, figure_args=[]):
+    """
+    List the figures of the Read the Doc site.
+
+    csv_data:       Dictionary of dataframes (average_measures,
+                    profile_measures, average_volume, profile_volume).
+    bundles:        Dictionary of average measures by bundle.
+    out_dir:        Output directory of the site.
+    figure_args:    Arguments added to each rd_* script call
+                    (ex. ['--save_as_png']).
+
+    Return          List of FigureJob.
+    """
+    def _out(folder):
+        return ['--out_dir', os.path.join(out_dir, folder)]
+
+    jobs = []
+    # Heatmap with session as slider
+    jobs += _get_script_jobs(rd_heatmap, csv_data['average_measures'], [
+        'average_measures.csv', '--longitudinal', '--use_as_slider',
+        'Session', '--reorder_measure', '--filter_missing'] +
+        _out('heatmap') + figure_args)
+    jobs += _get_script_jobs(rd_heatmap, csv_data['average_measures'], [
+        'average_measures.csv', '--add_average', '--longitudinal',
+        '--use_as_slider', 'Session', '--reorder_measure',
+        '--filter_missing', '--apply_on_pearson', 'absolute',
+        '--plot_size', '1000', '900',
+        '--out_name', 'correlation_heatmap_add_average'] +
+        _out('heatmap') + figure_args)
+
+    # Heatmap by bundles
+    for bundle, bundle_df in bundles.items():
+        jobs += _get_script_jobs(rd_heatmap, bundle_df, [
+            bundle + '_average_measures.csv', '--add_average',
+            '--longitudinal', '--use_as_slider', 'Session',
+            '--reorder_measure', '--filter_missing', '--apply_on_pearson',
+            'absolute', '--plot_size', '950', '900',
+            '--out_name', bundle + '_correlation_heatmap_add_average'] +
+            _out('heatmap') + figure_args)
+
+    # Correlation with menu for each bundles
+    jobs += _get_script_jobs(
+        rd_correlation_with_menu, csv_data['average_measures'],
+        ['average_measures.csv', '--longitudinal', '--split_by', 'Bundles'] +
+        _out('correlations') + figure_args)
+
+    # Distribution all bundles
+    jobs += _get_script_jobs(
+        rd_distribution_measures, csv_data['average_measures'],
+        ['average_measures.csv', '--split_by', 'Method', '--filter_missing',
+         '--apply_factor', '100',
+         '--out_name', '_measurement_distribution_with_factor'] +
+        _out('averages_figures') + figure_args)
+    jobs += _get_script_jobs(
+        rd_boxplot, csv_data['average_measures'],
+        ['average_measures.csv', '--split_by', 'Method', '--filter_missing',
+         '--apply_factor', '100',
+         '--out_name', '_measurement_boxplot_with_factor'] +
+        _out('averages_figures') + figure_args)
+    jobs += _get_script_jobs(
+        rd_boxplot, csv_data['average_volume'],
+        ['average_volume.csv', '--split_by', 'Method', '--filter_missing'] +
+        _out('distributions') + figure_args)
+
+    # Profile for each bundles
+    jobs += _get_script_jobs(
+        rd_profiles_measures, csv_data['profile_measures'],
+        ['profile_measures.csv', 'Section', 'Value', 'Bundle sections',
+         '--filter_missing', '--split_by', 'Bundles', '--use_as_slider',
+         'Session', '--apply_factor', '100', '--add_average',
+         '--out_prefix', 'AF'] +
+        _out('profile') + figure_args)
+    jobs += _get_script_jobs(
+        rd_profiles_measures, csv_data['profile_volume'],
+        ['profile_volume.csv', 'Section', 'Value', 'Profile',
+         '--out_name', 'volume_profile', '--filter_missing', '--split_by',
+         'Bundles', '--use_as_slider', 'Session', '--out_prefix', 'AF',
+         '--add_average'] +
+        _out('profile') + figure_args)
+
+    return jobs
@@ -6,8 +6,10 @@ Functions to generate interactive boxplots with plotly.
 
 import itertools
 
-import plotly.express as px
-import plotly.graph_objects as go
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
 def interactive_distribution_box(
         df, x_column, y_column, color_column, figtitle='', colormap='Set2',
@@ -5,7 +5,9 @@
 Set of functions used to prepare or get information from data for plotly figures.
 """
 
-from scipy.stats import linregress
+from common.lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
 
 def get_regression_line_stats(x, y, all_result=False, hypothesis='two-sided'):
     """
@@ -20,7 +22,7 @@ def get_regression_line_stats(x, y, all_result=False, hypothesis='two-sided'):
                     the p-value, which can be added as a legend in the
                     correlation plot.
     """
-    result = linregress(x, y, alternative=hypothesis)
+    result = stats.linregress(x, y, alternative=hypothesis)
     r, p = result[2], result[3]
     display_line = f'Pearson coefficient: r={r:.2f}, p={p:.2f}'
     if all_result:
@@ -9,13 +9,16 @@ Several types of heatmap are available:
 For the moment, more than 2 groups is not supported.
 """
 
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from plotly.colors import sequential
+
+from common.lazy import lazy_import
+
+go = lazy_import('plotly.graph_objects')
+subplots = lazy_import('plotly.subplots')
 
 
 def interactive_heatmap(corr_map, title='', colbar_title='',
-                        colormap=px.colors.sequential.YlGnBu,
+                        colormap=sequential.YlGnBu,
                         y_label='', x_label='', r_min=0.3, r_max=1,
                         tick_font_size=15, title_size=20, tick_angle=90,
                         fig_width=600, fig_height=600, kwgs={}):
@@ -56,7 +59,7 @@ def interactive_heatmap(corr_map, title='', colbar_title='',
 
 def interactive_heatmap_with_slider(
             corr_dfs, corr_dfs_names, title='', colbar_title='',
-            colormap=px.colors.sequential.YlGnBu,
+            colormap=sequential.YlGnBu,
             slider_label='Session ', y_label='Metrics by Bundles',
             r_min=0.3, r_max=1, tick_angle=45, tick_font_size=12,
             title_size=15, fig_width=600, fig_height=600,):
@@ -110,7 +113,7 @@ def interactive_heatmap_with_slider(
 
 def interactive_heatmap_group(corr_group1, corr_group2, label_group1,
                               label_group2, colbar_title="Pearson r",
-                              colormap=px.colors.sequential.YlGnBu,
+                              colormap=sequential.YlGnBu,
                               y_label='', r_min=0.3, r_max=1,
                               tick_font_size=15, title_size=20, tick_angle=90,
                               fig_width=700, fig_height=700, kwgs={}):
@@ -139,7 +142,7 @@ def interactive_heatmap_group(corr_group1, corr_group2, label_group1,
               " Please provide a same number of correlation matrix. ")
 
     # Create facetgrid to plot two heatmap corresponding to the two groups
-    fig = make_subplots(rows=1, cols=2, shared_yaxes=True, shared_xaxes=True)
+    fig = subplots.make_subplots(rows=1, cols=2, shared_yaxes=True, shared_xaxes=True)
 
     fig.append_trace(
         go.Heatmap(z=corr_group1.values, x=corr_group1.columns,
@@ -185,7 +188,7 @@ def interactive_heatmap_group(corr_group1, corr_group2, label_group1,
 
 def interactive_heatmap_group_with_slider(
                 corr_group1, corr_group2, label_group1, label_group2,
-                colormap=px.colors.sequential.YlGnBu, colbar_title="Pearson r",
+                colormap=sequential.YlGnBu, colbar_title="Pearson r",
                 slider_label='Session ', y_label='Metrics by Bundles',
                 r_min=0.3, r_max=1, tick_angle=45, tick_font_size=12,
                 title_size=15, fig_width=1150, fig_height=600,):
@@ -218,7 +221,7 @@ def interactive_heatmap_group_with_slider(
         print("The number of correlation matrix is not equal between groups.\n"
               " Please provide a same number of correlation matrix. ")
     # Create facetgrid to plot two heatmap corresponding to the two groups
-    fig = make_subplots(rows=1, cols=2, shared_yaxes=True, shared_xaxes=True)
+    fig = subplots.make_subplots(rows=1, cols=2, shared_yaxes=True, shared_xaxes=True)
 
     for curr_corr in range(len(corr_group1)):
         fig.append_trace(
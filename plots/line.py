@@ -8,10 +8,12 @@ Several types of heatmap are available:
 """
 
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 
-from plotly.subplots import make_subplots
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+subplots = lazy_import('plotly.subplots')
 
 def interactive_lineplot(df, x_col, y_col, color_col=False, xrange=None,
                          yrange=None, custom_y_dict=None, colormap='Set2',
@@ -105,7 +107,7 @@ def interactive_ridgeline(multi_df, x_col, y_col, colormap, generate_colors=True
     else:
         colors = colormap
 
-    fig = make_subplots(rows=nb_row, vertical_spacing = spacing,
+    fig = subplots.make_subplots(rows=nb_row, vertical_spacing = spacing,
                         shared_xaxes=shared_axis, shared_yaxes=shared_axis)
 
     for idx, frame in enumerate(multi_df):
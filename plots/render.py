@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Set of functions used to render a batch of plotly figures, sequentially or
+with a pool of processes.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+from plots.utils import (close_png_session, save_figures_as,
+                         start_png_session)
+
+
+# A figure to render: plot_func(**plot_kwargs) builds the figure which is
+# then saved with save_figures_as(fig, out_path, out_name, **save_kwargs).
+# plot_func must be defined at module level to be sent to the workers.
+FigureJob = namedtuple('FigureJob', ['plot_func', 'plot_kwargs', 'out_path',
+                                     'out_name', 'save_kwargs'])
+
+
+def _init_render_worker(save_as_png=False):
+    """Initialize a worker process. Start a PNG session keeping a single
+    kaleido renderer for all the PNG figures rendered by this worker.
+    Workers exit without running exit handlers, figures are written as soon
+    as they are saved."""
+    if save_as_png:
+        start_png_session(batch_size=1)
+
+
+def render_figure(job):
+    """
+    Build and save the figure of a job.
+
+    job:        FigureJob.
+
+    Return      Tuple (out_name, build_time, save_time), times in seconds.
+    """
+    start = time.perf_counter()
+    fig = job.plot_func(**job.plot_kwargs)
+    built = time.perf_counter()
+    save_figures_as(fig, job.out_path, job.out_name, **job.save_kwargs)
+    return job.out_name, built - start, time.perf_counter() - built
+
+
+def print_render_timings(timings):
+    """Print the build and save times of each rendered figure."""
+    print('{:<50} {:>10} {:>10}'.format('Figure', 'Build (s)', 'Save (s)'))
+    for out_name, build_time, save_time in timings:
+        print('{:<50} {:>10.2f} {:>10.2f}'.format(out_name, build_time,
+                                                  save_time))
+    print('{:<50} {:>10.2f} {:>10.2f}'.format(
+        'Total', sum(curr[1] for curr in timings),
+        sum(curr[2] for curr in timings)))
+
+
+def render_figure_jobs(jobs, nbr_processes=1, report_timings=True):
+    """
+    Render a list of figure jobs. With more than one process, figures are
+    built and saved in a pool of processes. Otherwise PNG figures are
+    exported by batch, their save times only include the queueing.
+
+    jobs:               List of FigureJob.
+    nbr_processes:      Number of processes used to render figures.
+    report_timings:     If True, print the build and save times per figure.
+
+    Return              List of tuples (out_name, build_time, save_time) in
+                        the order of jobs.
+    """
+    save_as_png = any(job.save_kwargs.get('save_as_png') for job in jobs)
+    export_time = None
+
+    if nbr_processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(nbr_processes, len(jobs)),
+                                 initializer=_init_render_worker,
+                                 initargs=(save_as_png,)) as executor:
+            timings = list(executor.map(render_figure, jobs))
+    else:
+        if save_as_png:
+            start_png_session()
+        try:
+            timings = [render_figure(job) for job in jobs]
+        finally:
+            start = time.perf_counter()
+            close_png_session()
+            if save_as_png:
+                export_time = time.perf_counter() - start
+
+    if report_timings:
+        print_render_timings(timings)
+        if export_time is not None:
+            print('{:<50} {:>21.2f}'.format('Batched PNG export',
+                                            export_time))
+
+    return timings
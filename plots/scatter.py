@@ -11,11 +11,12 @@ Several types of heatmap are available:
 
 import itertools
 
-import plotly.express as px
-import plotly.graph_objects as go
-
+from common.lazy import lazy_import
 from plots.utils import save_trend_from_plot, add_ols_info, fetch_ols_results
 
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
 
 def interactive_distribution_scatter(
         df, x_column, y_column, color_column, figtitle='', colormap='Set2',
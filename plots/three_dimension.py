@@ -10,13 +10,15 @@ import numpy as np
 import math
 import pandas as pd
 
-import plotly.express as px
-import plotly.graph_objects as go
+from common.lazy import lazy_import
 
-from mpl_toolkits.mplot3d import Axes3D #axes3d
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm           # import colormap stuff!
-from matplotlib.cm import get_cmap
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+# matplotlib is only used by the static 3-D figures
+mplot3d = lazy_import('mpl_toolkits.mplot3d')
+plt = lazy_import('matplotlib.pyplot')
+cm = lazy_import('matplotlib.cm')
 
 
 
@@ -88,12 +90,12 @@ def bar_charts3d(
     # Selecting an appropriate colormap +
     # Choosing the range of values to be extended in the set colormap
     values = np.linspace(0.2, 1., x_mesh_position.ravel().shape[0])
-    colorname = get_cmap(colors_name)
+    colorname = cm.get_cmap(colors_name)
     colors = colorname(values)
 
     #change the width of the axis
     ax.bar3d(xpos,ypos,zpos, 1, 1, dz,   alpha=0.7, zsort='max',color=colors)
-    ax.get_proj = lambda: np.dot(Axes3D.get_proj(ax), np.diag([1,0.4, 1, 1]))
+    ax.get_proj = lambda: np.dot(mplot3d.Axes3D.get_proj(ax), np.diag([1,0.4, 1, 1]))
 
     #max_height = np.max(z)   # get range of colorbars
     #min_height = np.min(z)
@@ -139,36 +141,30 @@ def interactive_barchart3d(labels, z_data, title, z_title,
     thikness *= 0.5
     ann = []
 
-    fig = go.Figure()
+    # All bars are merged in a single mesh
+    z_data = np.asarray(z_data, dtype=float)
+    y_cnt, x_cnt = np.divmod(np.arange(len(z_data)), n_row)
+    x, y, z, i, j, k = get_boxes_mesh(x_cnt - thikness, x_cnt + thikness,
+                                      y_cnt - thikness, y_cnt + thikness,
+                                      0, z_data)
+    fig = go.Figure(go.Mesh3d(x=x, y=y, z=z, i=i, j=j, k=k, intensity=z,
+                              coloraxis='coloraxis', hoverinfo='skip',
+                              **kwargs))
 
     for iz, z_max in enumerate(z_data):
-        x_cnt, y_cnt = iz % n_row, iz // n_row
-        x_min, y_min = x_cnt - thikness, y_cnt - thikness
-        x_max, y_max = x_cnt + thikness, y_cnt + thikness
-
-        fig.add_trace(go.Mesh3d(
-            x=[x_min, x_min, x_max, x_max, x_min, x_min, x_max, x_max],
-            y=[y_min, y_max, y_max, y_min, y_min, y_max, y_max, y_min],
-            z=[0, 0, 0, 0, z_max, z_max, z_max, z_max],
-            alphahull=0,
-            intensity=[0, 0, 0, 0, z_max, z_max, z_max, z_max],
-            coloraxis='coloraxis',
-            hoverinfo='skip',
-            **kwargs))
-
         ann.append(dict(
-            showarrow=False, x=x_cnt, y=y_cnt, z=z_max,
+            showarrow=False, x=int(x_cnt[iz]), y=int(y_cnt[iz]), z=z_max,
             text=f'<b>#{iz+1}</b>', font=dict(color='white', size=11),
             bgcolor='rgba(0, 0, 0, 0.3)', xanchor='center', yanchor='middle',
             hovertext=f'{z_max} {labels[iz]}'))
 
     # mesh3d doesn't currently support showLegend param, so
     # add invisible scatter3d with names to show legend
-    for i, label in enumerate(labels):
+    for idx, label in enumerate(labels):
         fig.add_trace(go.Scatter3d(
             x=[None], y=[None], z=[None],
             opacity=0,
-            name=f'#{i+1} {label}'))
+            name=f'#{idx+1} {label}'))
 
     fig.update_layout(
         width=width, height=height,
@@ -198,6 +194,34 @@ def interactive_barchart3d(labels, z_data, title, z_title,
 
 
 
+# Triangles of a box from its 8 vertices (see get_boxes_mesh).
+BOX_FACES_I = [7, 0, 0, 0, 4, 4, 6, 6, 4, 0, 3, 2]
+BOX_FACES_J = [3, 4, 1, 2, 5, 6, 5, 2, 0, 1, 6, 3]
+BOX_FACES_K = [0, 7, 2, 3, 6, 7, 1, 1, 5, 5, 7, 6]
+
+
+def get_boxes_mesh(x_min, x_max, y_min, y_max, z_min, z_max):
+    """
+    Vertices and triangles of a set of boxes, merged in a single mesh.
+    Arguments are arrays with one value per box (or scalars).
+
+    Return  x, y, z arrays of the vertices (8 per box) and i, j, k arrays of
+            the triangles (12 per box), as used by go.Mesh3d.
+    """
+    x_min, x_max, y_min, y_max, z_min, z_max = np.broadcast_arrays(
+        *[np.asarray(curr, dtype=float)
+          for curr in [x_min, x_max, y_min, y_max, z_min, z_max]])
+    x = np.stack([x_min, x_min, x_max, x_max] * 2, axis=1).ravel()
+    y = np.stack([y_min, y_max, y_max, y_min] * 2, axis=1).ravel()
+    z = np.stack([z_min] * 4 + [z_max] * 4, axis=1).ravel()
+
+    offsets = 8 * np.arange(len(x_min))[:, np.newaxis]
+    i = (offsets + BOX_FACES_I).ravel()
+    j = (offsets + BOX_FACES_J).ravel()
+    k = (offsets + BOX_FACES_K).ravel()
+    return x, y, z, i, j, k
+
+
 ## From barchart_latest_m.py
 def generate_3dmesh(x_min, x_max, y_min, y_max, z_min, z_max, color_value,
                   flat_shading, hover_info, opacity: float = 1):
@@ -209,9 +233,9 @@ def generate_3dmesh(x_min, x_max, y_min, y_max, z_min, z_max, color_value,
         z=[z_min, z_min, z_min, z_min,
             z_max, z_max, z_max, z_max,],
         color=color_value,
-        i=[7, 0, 0, 0, 4, 4, 6, 6, 4, 0, 3, 2],
-        j=[3, 4, 1, 2, 5, 6, 5, 2, 0, 1, 6, 3],
-        k=[0, 7, 2, 3, 6, 7, 1, 1, 5, 5, 7, 6],
+        i=BOX_FACES_I,
+        j=BOX_FACES_J,
+        k=BOX_FACES_K,
         opacity=opacity,
         flatshading=flat_shading,
         hovertext='text',
@@ -230,7 +254,7 @@ def create_z_grid(len_x, len_y, z_df):
 
     
 
-def figure_layout(fig: go.Figure, xaxis_legend: str, len_xaxis, yaxis_legend,
+def figure_layout(fig: 'go.Figure', xaxis_legend: str, len_xaxis, yaxis_legend,
                   len_yaxis, x_min, x_title, y_title,  z_legend, z_title,
                   title,):
     y_min = 0
@@ -260,7 +284,7 @@ def bar_charts3d_categorical(x, y, z, x_min=0, y_min=0, z_min='auto',
                             step=1, color='x', x_legend='auto', y_legend='auto',
                             z_legend='auto', flat_shading=True, x_title='',
                             y_title='', z_title='', hover_info='z',
-                            title='',opacity_val=0.9,) -> go.Figure:
+                            title='',opacity_val=0.9,) -> 'go.Figure':
 
     # Load data as Series
     x_values, y_values, z_values = pd.Series(x), pd.Series(y), pd.Series(z)
@@ -273,38 +297,38 @@ def bar_charts3d_categorical(x, y, z, x_min=0, y_min=0, z_min='auto',
 
     # Generic parameters for mesh
     colormap = px.colors.qualitative.Prism #Plotly
-    curr_color = 0
-
-    # Based on idx from pd.Series of z (set to -1 to have 0)
-    # add 1 at each loop to have corresponding z-value to x and y
-    z_idx_count = -1
 
     if z_min == 'auto':
         z_min = 0.5 * min(z_values)
 
-    # Generate mesh for x,y and associated z-value with colors
-    curr_mesh = []
-    for idx_x, x_label in enumerate(x_labels):
-        if color == 'x':
-            curr_color = colormap[idx_x % 9]
-        for idx_y, y_label in enumerate(y_labels):
-            z_idx_count += 1
-            if color == 'x+y':
-                curr_color = colormap[(idx_x + idx_y * len_y_labels) % 9]
-            elif color == 'y':
-                curr_color = colormap[idx_y % 9]
-
-            x_max = x_min + step
-            y_max = y_min + step
-            z_max=z_values[z_idx_count]
-
-            curr_mesh.append(generate_3dmesh(x_min, x_max, y_min, y_max,
-                                             z_min, z_max, curr_color,
-                                             flat_shading, hover_info,
-                                             opacity=opacity_val),)
-            x_min += 2 * step
-        y_min += 2 * step
-        x_min = 0
+    # One bar for each x and y labels, bars of a x label are along the
+    # x axis (z-values ordered by x then y labels)
+    idx_x, idx_y = np.divmod(np.arange(len_x_labels * len_y_labels),
+                             len_y_labels)
+    bar_x_min = np.where(idx_x == 0, x_min, 0) + idx_y * 2 * step
+    bar_y_min = y_min + idx_x * 2 * step
+    x_min = 0
+
+    if color == 'x':
+        color_idx = idx_x % 9
+    elif color == 'x+y':
+        color_idx = (idx_x + idx_y * len_y_labels) % 9
+    elif color == 'y':
+        color_idx = idx_y % 9
+    else:
+        raise ValueError("color must be 'x', 'y' or 'x+y', got {}.".format(
+            color))
+
+    # Generate a single mesh for all bars, colored by triangle
+    x, y, z, i, j, k = get_boxes_mesh(bar_x_min, bar_x_min + step,
+                                      bar_y_min, bar_y_min + step, z_min,
+                                      z_values.values[:len(idx_x)])
+    curr_mesh = go.Mesh3d(
+        x=x, y=y, z=z, i=i, j=j, k=k,
+        facecolor=np.repeat([colormap[curr] for curr in color_idx],
+                            len(BOX_FACES_I)),
+        opacity=opacity_val, flatshading=flat_shading, hovertext='text',
+        hoverinfo=hover_info)
 
     # Set legends of 3d layout axis
     if x_legend == 'auto':
@@ -342,17 +366,20 @@ def plots_3d_scatter(df, xcol, ycol, zcol, xlabel, ylabel, zlabel):
     return fig, ax
 
 
-def get_slider_dict_for_3dvolume(z_length, use_prefix='', start_at=1):
-    return [dict(
-        steps=[dict(
+def get_slider_dict_for_3dvolume(z_length, use_prefix='', start_at=1,
+                                 z_stride=1):
+    steps = [dict(
             method='animate',
             args=[[f'frame{single_slice+1}'],
                   dict(mode='immediate',
                        frame=dict(duration=10, redraw=True),
                        transition=dict(duration=0))],
-            label=f'{single_slice+1}') 
-            for single_slice in range(int(start_at), z_length)],
-        active=17, transition=dict(duration=0), x=0, y=0,
+            label=f'{single_slice+1}')
+            for single_slice in range(int(start_at), z_length, z_stride)]
+    return [dict(
+        steps=steps,
+        active=min(17, max(len(steps) - 1, 0)), transition=dict(duration=0),
+        x=0, y=0,
         currentvalue=dict(font=dict(size=12), prefix=use_prefix + ': ',
                           visible=True, xanchor='center'),
         len=1.0)]
@@ -364,26 +391,101 @@ def frame_arguments(duration):
             "transition": {"duration": duration, "easing": "linear"}, }
 
 
+def downsample_volume(volume, factor):
+    """
+    Downsample each slice of a volume by averaging blocks of voxels.
+
+    volume:     Array (z, x, y).
+    factor:     Size of the blocks in voxels, the last voxels are cropped
+                if the slice size is not a multiple of factor.
+
+    Return      Array (z, x // factor, y // factor) in float32.
+    """
+    if factor <= 1:
+        return volume
+    z_size, x_size, y_size = volume.shape
+    x_crop, y_crop = x_size - x_size % factor, y_size - y_size % factor
+    blocks = volume[:, :x_crop, :y_crop].reshape(
+        z_size, x_crop // factor, factor, y_crop // factor, factor)
+    return blocks.mean(axis=(2, 4), dtype=np.float32)
+
+
+def quantize_volume(volume, color_range=None):
+    """
+    Quantize the intensities of a volume to uint8, values outside
+    color_range are clipped.
+
+    volume:         Array.
+    color_range:    Minimum and maximum values mapped to 0 and 255.
+                    Default: min and max of the volume.
+
+    Return          Array in uint8 and the (min, max) range used.
+    """
+    if color_range is None:
+        color_range = (float(np.nanmin(volume)), float(np.nanmax(volume)))
+    v_min, v_max = color_range
+    scale = 255. / (v_max - v_min) if v_max > v_min else 0.
+    quantized = (np.nan_to_num(volume, nan=v_min) - v_min) * scale
+    return (np.round(np.clip(quantized, 0, 255)).astype(np.uint8),
+            (v_min, v_max))
+
+
 def generate_3d_volume(volume, z_max, z_n_slices, z_step, x_size, y_size,
                        colorname, title='', start_at=1, add_buttons=True,
-                       prefix_slider='z slice',  show_scale=False):
+                       prefix_slider='z slice',  show_scale=False,
+                       z_stride=1, color_range=None, value_range=None,
+                       shared_geometry=False):
+    """
+    Generate an interactive view of a volume, the z slices are displayed
+    with a slider.
+
+    z_stride:       Only one slice out of z_stride has a frame.
+    color_range:    Values of volume mapped to the colorscale (cmin, cmax).
+                    Default: range of each slice.
+    value_range:    Real values of color_range, used to label the colorbar
+                    of a quantized volume (see quantize_volume).
+    shared_geometry:    If True, all frames reuse the plane of the initial
+                        surface and only contain the colors of their slice,
+                        the slice position is given by the z axis range.
+    """
+    color_kwargs = {}
+    if color_range is not None:
+        color_kwargs = dict(cmin=color_range[0], cmax=color_range[1])
+        if value_range is not None:
+            tick_values = np.linspace(color_range[0], color_range[1], 5)
+            tick_labels = np.linspace(value_range[0], value_range[1], 5)
+            color_kwargs['colorbar'] = dict(
+                tickvals=tick_values.tolist(),
+                ticktext=['{:.3g}'.format(curr) for curr in tick_labels])
 
     # Create initial surface grid corresponding to image size and color
     init_surface = go.Surface(z=z_max*np.ones((x_size, y_size)),
                               surfacecolor=np.flipud(volume[-1]),
-                              colorscale=colorname, showscale=show_scale)
+                              colorscale=colorname, showscale=show_scale,
+                              **color_kwargs)
 
     # Create frame from data
-    set_frames = [go.Frame(
-        data=[dict(type='surface', 
-                   z=z_max-curr_slice*z_step * np.ones((x_size, y_size)),
-                   surfacecolor=np.flipud(volume[-1-curr_slice]))],
-        name=f'frame{curr_slice+1}')
-                for curr_slice in range(int(start_at), z_n_slices)]
+    if shared_geometry:
+        # The plane keeps the z of the initial surface, each frame only
+        # sends its colors and shifts the z axis range by its offset.
+        set_frames = [go.Frame(
+            data=[dict(type='surface',
+                       surfacecolor=np.flipud(volume[-1-curr_slice]))],
+            layout=dict(scene=dict(zaxis=dict(
+                range=[-0.1 + curr_slice*z_step, z_max + curr_slice*z_step]))),
+            name=f'frame{curr_slice+1}')
+                for curr_slice in range(int(start_at), z_n_slices, z_stride)]
+    else:
+        set_frames = [go.Frame(
+            data=[dict(type='surface',
+                       z=z_max-curr_slice*z_step * np.ones((x_size, y_size)),
+                       surfacecolor=np.flipud(volume[-1-curr_slice]))],
+            name=f'frame{curr_slice+1}')
+                for curr_slice in range(int(start_at), z_n_slices, z_stride)]
 
     # Interactive view configuration
-    slider_dict = get_slider_dict_for_3dvolume(z_n_slices, prefix_slider, 
-                                               start_at)
+    slider_dict = get_slider_dict_for_3dvolume(z_n_slices, prefix_slider,
+                                               start_at, z_stride=z_stride)
 
     # Create layout with slicer for interactive view
     set_layout = dict(title_text=title, title_x=0.5, width=900, height=700,
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Functions for generating a tri-planar (sagittal, coronal, axial) view of a
+volume with plotly. Slices are not embedded in the HTML : each slice is
+written as a binary chunk (uint8) in a folder next to the HTML and fetched
+by the page when its slider moves.
+
+The page must be served over http to fetch the slices
+(ex. python -m http.server in the output directory, or Read the Doc).
+"""
+
+import json
+import os
+
+import numpy as np
+
+from common.lazy import lazy_import
+from plots.three_dimension import quantize_volume
+
+go = lazy_import('plotly.graph_objects')
+subplots = lazy_import('plotly.subplots')
+
+
+# Axis of the volume (x, y, z) sliced by each view.
+TRIPLANAR_VIEWS = [('sagittal', 0), ('coronal', 1), ('axial', 2)]
+
+# Sliders of the views, created by the page. {viewer} is replaced by the
+# json configuration of the viewer (see generate_triplanar_view).
+_TRIPLANAR_SCRIPT = """
+var gd = document.getElementById('{plot_id}');
+var viewer = {viewer};
+var chunks = {};
+
+function fetchSlice(view, index) {
+    var url = viewer.folder + '/' + view.name + '_' +
+              String(index).padStart(4, '0') + '.bin';
+    if (!(url in chunks)) {
+        chunks[url] = fetch(url).then(function(response) {
+            if (!response.ok) {
+                throw new Error(response.status + ' ' + response.statusText);
+            }
+            return response.arrayBuffer();
+        }).then(function(buffer) {
+            var data = new Uint8Array(buffer), rows = [];
+            for (var i = 0; i < view.shape[0]; i++) {
+                rows.push(Array.from(data.subarray(i * view.shape[1],
+                                                   (i + 1) * view.shape[1])));
+            }
+            return rows;
+        }).catch(function(error) {
+            // Forget the failed slice, it is fetched again on the next move
+            delete chunks[url];
+            console.error('Failed to load ' + url + ': ' + error);
+            throw error;
+        });
+    }
+    return chunks[url];
+}
+
+var container = document.createElement('div');
+container.style.display = 'flex';
+container.style.justifyContent = 'space-around';
+viewer.views.forEach(function(view) {
+    var label = document.createElement('label');
+    var text = document.createElement('span');
+    var slider = document.createElement('input');
+    slider.type = 'range';
+    slider.min = 0;
+    slider.max = view.n_slices - 1;
+    slider.value = view.current;
+    text.textContent = view.name + ' ' + view.current;
+    slider.addEventListener('input', function() {
+        var index = parseInt(slider.value);
+        text.textContent = view.name + ' ' + index;
+        fetchSlice(view, index).then(function(rows) {
+            if (parseInt(slider.value) === index) {
+                Plotly.restyle(gd, {z: [rows]}, [view.trace]);
+            }
+        }).catch(function() {});
+    });
+    label.appendChild(text);
+    label.appendChild(slider);
+    container.appendChild(label);
+});
+gd.parentNode.insertBefore(container, gd.nextSibling);
+"""
+
+
+def get_view_slice(volume, axis, index):
+    """
+    Return a slice of a volume (x, y, z) as displayed by a heatmap of the
+    tri-planar view (rows on the vertical axis).
+    """
+    return np.ascontiguousarray(np.take(volume, index, axis=axis).T)
+
+
+def write_slice_chunks(volume, out_dir):
+    """
+    Write each slice of the three views of a volume as a binary chunk,
+    named VIEW_NNNN.bin.
+
+    volume:     Array (x, y, z) in uint8 (see quantize_volume).
+    out_dir:    Output folder of the chunks, created if missing.
+
+    Return      List of dictionaries (name, axis, n_slices, shape) of the
+                views.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    views = []
+    for name, axis in TRIPLANAR_VIEWS:
+        for index in range(volume.shape[axis]):
+            curr_slice = get_view_slice(volume, axis, index)
+            curr_slice.tofile(os.path.join(
+                out_dir, '{}_{:04d}.bin'.format(name, index)))
+        views.append(dict(name=name, axis=axis,
+                          n_slices=volume.shape[axis],
+                          shape=list(curr_slice.shape)))
+    return views
+
+
+def generate_triplanar_view(volume, out_dir, chunk_folder, colorname='Greys',
+                            title='', color_range=None, show_scale=False):
+    """
+    Generate a tri-planar view of a volume. The middle slices are embedded
+    in the figure, the other slices are written in out_dir/chunk_folder and
+    loaded by the page.
+
+    volume:         Array (x, y, z).
+    out_dir:        Output directory of the HTML.
+    chunk_folder:   Folder of the slices, relative to out_dir.
+    colorname:      Plotly colorscale.
+    title:          Title of the figure.
+    color_range:    Minimum and maximum values of the colorscale.
+                    Default: min and max of the volume.
+    show_scale:     Display the colorbar.
+
+    Return          Figure and the javascript to give to save_figures_as
+                    (post_script).
+    """
+    volume, value_range = quantize_volume(volume, color_range)
+    views = write_slice_chunks(volume, os.path.join(out_dir, chunk_folder))
+
+    fig = subplots.make_subplots(rows=1, cols=3, subplot_titles=[
+        view['name'].capitalize() for view in views])
+    tick_values = np.linspace(0, 255, 5)
+    tick_labels = np.linspace(value_range[0], value_range[1], 5)
+    for trace, view in enumerate(views):
+        view['trace'] = trace
+        view['current'] = view['n_slices'] // 2
+        fig.add_trace(go.Heatmap(
+            z=get_view_slice(volume, view['axis'], view['current']),
+            zmin=0, zmax=255, colorscale=colorname,
+            showscale=show_scale and trace == len(views) - 1,
+            colorbar=dict(tickvals=tick_values.tolist(),
+                          ticktext=['{:.3g}'.format(curr)
+                                    for curr in tick_labels]),
+            hoverinfo='skip'), row=1, col=trace + 1)
+        axis_suffix = '' if trace == 0 else str(trace + 1)
+        fig.update_yaxes(scaleanchor='x' + axis_suffix, row=1, col=trace + 1)
+
+    fig.update_xaxes(showticklabels=False, showgrid=False, zeroline=False)
+    fig.update_yaxes(showticklabels=False, showgrid=False, zeroline=False)
+    fig.update_layout(title_text=title, title_x=0.5, width=1200, height=500,
+                      plot_bgcolor='black')
+
+    viewer = dict(folder=chunk_folder, views=views)
+    post_script = _TRIPLANAR_SCRIPT.replace('{viewer}', json.dumps(viewer))
+    return fig, post_script
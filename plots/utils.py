@@ -5,8 +5,19 @@
 Set of functions used to prepare data for plotly figures.
 """
 
+import atexit
 import os
-import plotly.express as px
+
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
+pio = lazy_import('plotly.io')
+offline = lazy_import('plotly.offline')
+
+
+# PNG exports waiting to be written by the running PNG session, see
+# start_png_session. None when no session is running.
+_PNG_SESSION = None
 
 
 def generate_reorder_list(df, ordered_argument_list, with_column):
@@ -32,33 +43,154 @@ def generate_reorder_list(df, ordered_argument_list, with_column):
     return reorder_columns_list
 
 
+def write_shared_plotlyjs(out_path, bundle_name='plotly.min.js'):
+    """
+    Function to write the plotly.js bundle used by HTML figures saved with
+    a shared plotly.js. The bundle is only written if it does not exist,
+    so all the figures of a run share a single file.
+
+    out_path:       Output path of the HTML figures.
+    bundle_name:    Path of the bundle relative to out_path.
+
+    Return  Path of the bundle to use as script source in the HTML.
+    """
+    # plotly only uses include_plotlyjs as a script path if it ends in .js
+    if not bundle_name.endswith('.js'):
+        raise ValueError('The shared plotly.js file must end in .js, got '
+                         '{}.'.format(bundle_name))
+    bundle_path = os.path.join(out_path, bundle_name)
+    if not os.path.isfile(bundle_path):
+        os.makedirs(os.path.dirname(os.path.abspath(bundle_path)),
+                    exist_ok=True)
+        # Write in a temporary file first, several figures can be saved
+        # at the same time
+        tmp_path = bundle_path + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as bundle:
+            bundle.write(offline.get_plotlyjs())
+        os.replace(tmp_path, bundle_path)
+    return bundle_name.replace(os.sep, '/')
+
+
+def start_png_session(batch_size=20):
+    """
+    Function to start a PNG session. During a session, a single kaleido
+    renderer is kept alive and the PNG figures saved with save_figures_as
+    are queued and exported by batch instead of one at a time.
+    Pending figures are written by flush_png_session, close_png_session or
+    when the process exits.
+
+    batch_size:     Number of queued figures triggering an export.
+                    Use 1 to write each figure immediately.
+    """
+    global _PNG_SESSION
+    if _PNG_SESSION is not None:
+        return
+
+    server_started = False
+    try:
+        import kaleido
+    except ImportError:
+        kaleido = None
+    # Recent kaleido versions start a new browser for each export unless a
+    # server is running, older versions keep their renderer once started.
+    if kaleido is not None and hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server(silence_warnings=True)
+        server_started = True
+
+    _PNG_SESSION = {'pending': [], 'batch_size': max(1, batch_size),
+                    'server_started': server_started}
+    atexit.register(close_png_session)
+
+
+def flush_png_session():
+    """
+    Function to write the figures queued by the running PNG session.
+    Figures sharing the same export parameters are written with a single
+    call to the renderer when plotly supports it.
+    """
+    if _PNG_SESSION is None or not _PNG_SESSION['pending']:
+        return
+
+    batches = {}
+    for fig, filename, scale, width, height in _PNG_SESSION['pending']:
+        batches.setdefault((scale, width, height), []).append((fig, filename))
+    _PNG_SESSION['pending'] = []
+
+    for (scale, width, height), exports in batches.items():
+        figs, filenames = zip(*exports)
+        if hasattr(pio, 'write_images'):
+            pio.write_images(list(figs), list(filenames), scale=scale,
+                             width=width, height=height)
+        else:
+            for fig, filename in exports:
+                fig.write_image(filename, scale=scale, width=width,
+                                height=height)
+
+
+def close_png_session():
+    """
+    Function to write the pending figures and stop the PNG session.
+    """
+    global _PNG_SESSION
+    if _PNG_SESSION is None:
+        return
+
+    try:
+        flush_png_session()
+    finally:
+        if _PNG_SESSION['server_started']:
+            import kaleido
+            kaleido.stop_sync_server(silence_warnings=True)
+        _PNG_SESSION = None
+        atexit.unregister(close_png_session)
+
+
 def save_figures_as(fig, out_path, out_name, is_slider=False,
                     save_as_png=False, dpi_scale=6, heigth_value=1000,
-                    width_value=1000, play=False):
+                    width_value=1000, play=False, shared_plotlyjs=None,
+                    post_script=None):
     """
     Function to save figures as HTML or PNG files. 
     By default, figure is saved  in HTML without auto play.
-
-    fig:            Figure structure.
-    out_path:       Output path to save figure.
-    out_name:       Output name to save figure without extension.
-    is_slider:      If True display a warning message.
-    save_as_png:    Save the figure as a PNG file. 
-    dpi_scale:      PNG file resolution.
-    heigth_value:   Heigth to save PNG file
-    width_value:    Width to save PNG file.
-    play:           Option to play automatically or not the slider.
+    When a PNG session is running (see start_png_session), PNG files are
+    queued and written by batch.
+
+    fig:                Figure structure.
+    out_path:           Output path to save figure.
+    out_name:           Output name to save figure without extension.
+    is_slider:          If True display a warning message.
+    save_as_png:        Save the figure as a PNG file. 
+    dpi_scale:          PNG file resolution.
+    heigth_value:       Heigth to save PNG file
+    width_value:        Width to save PNG file.
+    play:               Option to play automatically or not the slider.
+    shared_plotlyjs:    Path of a plotly.js bundle relative to out_path.
+                        If provided, the HTML references this bundle instead
+                        of embedding plotly.js (see write_shared_plotlyjs).
+    post_script:        Javascript run after the plot is created in the HTML,
+                        {plot_id} is replaced by the id of the plot div.
 
     Return  HTML or PNG file 
     """
     if save_as_png:
         if is_slider:
             print("With PNG you don't have access to the slider option.\n")
-        fig.write_image(os.path.join(out_path, out_name + '.png'),
-                        scale=dpi_scale, heigth=heigth_value, width=width_value)
+        filename = os.path.join(out_path, out_name + '.png')
+        if _PNG_SESSION is None:
+            fig.write_image(filename, scale=dpi_scale, height=heigth_value,
+                            width=width_value)
+        else:
+            _PNG_SESSION['pending'].append((fig, filename, dpi_scale,
+                                            width_value, heigth_value))
+            if len(_PNG_SESSION['pending']) >= _PNG_SESSION['batch_size']:
+                flush_png_session()
     else:
+        include_plotlyjs = True
+        if shared_plotlyjs:
+            include_plotlyjs = write_shared_plotlyjs(out_path, shared_plotlyjs)
         fig.write_html(os.path.join(out_path, out_name + '.html'),
-                       auto_play=play)
+                       auto_play=play, include_plotlyjs=include_plotlyjs,
+                       post_script=post_script)
 
 
 def check_df_for_columns(df, split_filter=None, profile=None):
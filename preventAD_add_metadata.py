@@ -28,9 +28,8 @@ import os
 
 import pandas as pd
 import numpy as np
-import plotly.express as px
 
-from scilpy.io.utils import (add_overwrite_arg,
+from common.io_utils import (add_overwrite_arg,
                              assert_inputs_exist)
 
 
@@ -14,17 +14,20 @@ rd_boxplot.py data.csv
 """
 
 import argparse
+import copy
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_processes_arg,
+                             add_shared_plotlyjs_arg, assert_inputs_exist,
+                             validate_nbr_processes)
 from dataframe.parameters import scaling_metrics
 from dataframe.func import split_df_by, add_average_from_longitudinal
 from dataframe.utils import load_df, get_row_name_from_col
 from plots.parameters import (average_parameters_dict, order_plot_dict,
                               bundle_dict_color_v1, bundle_dict_color_v10,
                               metric_colors, boxplot_parameters_dict)
-from plots.utils import (check_df_for_columns, check_agreement_with_dict,
-                         save_figures_as)
+from plots.utils import check_df_for_columns, check_agreement_with_dict
 from plots.boxplot import interactive_distribution_box, interactive_boxplot
+from plots.render import FigureJob, render_figure_jobs
 
 
 def _build_arg_parser():
@@ -88,23 +91,28 @@ def _build_arg_parser():
     p.add_argument('--dpi_scale', type=int, default=6,
                    help='Use to increase (>1) or decrease (<1) the '
                         ' image resolution. [%(default)s]')
+    add_shared_plotlyjs_arg(p)
+    add_processes_arg(p)
     add_overwrite_arg(p)
 
     return p
 
 
-def main():
-    parser = _build_arg_parser()
-    args = parser.parse_args()
+def get_figure_jobs(df, args):
+    """
+    Filter the dataframe according to the script options and list the
+    figures to render.
 
-    assert_inputs_exist(parser, args.in_csv)
+    df:     Dataframe loaded from in_csv.
+    args:   Arguments of the script.
 
+    Return  List of FigureJob.
+    """
+    # Defaults are set here, rd_build_site.py lists the figures without
+    # calling main()
     if args.out_dir is None:
         args.out_dir = './'
 
-    # Load and filter Dataframe
-    df = load_df(args.in_csv)
-
     if args.use_stats:
         df = df.loc[df.Statistics == args.use_stats].reset_index(drop=True)
     if args.rbx_version:
@@ -130,12 +138,12 @@ def main():
                                    ignore_lenght=True, 
                                    rm_missing=args.filter_missing)
 
-    if args.use_as_slider:
-        if args.custom_colors is not None:
-            metrics_colors = args.custom_colors
-        else:
-            metrics_colors = metric_colors
+    save_kwargs = dict(save_as_png=args.save_as_png, dpi_scale=args.dpi_scale,
+                       heigth_value=args.plot_size[1],
+                       width_value=args.plot_size[0],
+                       shared_plotlyjs=args.shared_plotlyjs)
 
+    if args.use_as_slider:
         bundle = df['Bundles'].unique().tolist()[0]
         curr_title = "Boxplot of " + bundle + " measurements"
     
@@ -151,106 +159,91 @@ def main():
         else:
             custom_yaxis = boxplot_parameters_dict
 
+        # Copy the ranges, they are rescaled when a factor is applied
+        custom_yaxis = copy.deepcopy(custom_yaxis)
         if args.apply_factor:
             for metric in get_row_name_from_col(df, args.use_as_slider):
                 if metric in scaling_metrics:
                     custom_yaxis[metric][0] *= args.apply_factor
                     custom_yaxis[metric][1] *= args.apply_factor
 
-        fig = interactive_boxplot(
-                    df, 'Session', 'Value', color_col='Measures',
-                    custom_y_dict=custom_yaxis, colormap=metric_colors,
-                    frame='Measures', group='Measures', title=curr_title,
+        plot_kwargs = dict(
+                    df=df, x_col='Session', y_col='Value',
+                    color_col='Measures', custom_y_dict=custom_yaxis,
+                    colormap=metric_colors, frame='Measures',
+                    group='Measures', title=curr_title,
                     template="plotly_white", fig_width=args.plot_size[0],
                     fig_height=args.plot_size[1],
                     custom_scale_list=scaling_metrics,
                     custom_scale_name='Value (x10-3)')
 
-        outname = bundle + args.out_name
+        return [FigureJob(interactive_boxplot, plot_kwargs, args.out_dir,
+                          bundle + args.out_name,
+                          dict(save_kwargs, play=args.autoplay))]
 
-        save_figures_as(fig, args.out_dir, outname,
-                    save_as_png=args.save_as_png, dpi_scale=args.dpi_scale,
-                    heigth_value=args.plot_size[1],
-                    width_value=args.plot_size[0], play=args.autoplay)
-
-    elif args.split_by:
+    if args.split_by:
         check_df_for_columns(df, split_filter=args.split_by)
         multi_df, df_names = split_df_by(df, args.split_by)
-        for frame, curr_method in zip(multi_df, df_names):
-            curr_title = "Boxplot of " + curr_method + " measurements"
-
-            if args.custom_order and args.custom_y is not None:
-                custom_order = args.custom_order[curr_method]
-                custom_yaxis = args.custom_y
-            elif args.use_data:
-                custom_order = frame['Measures'].unique().tolist()
-                custom_yaxis = False
-            else:
-                custom_order = order_plot_dict[curr_method]
-                custom_yaxis = average_parameters_dict
-
-            if args.apply_factor:
-                for metric in custom_order:
-                    if metric in scaling_metrics:
-                        custom_yaxis[metric][1] *= args.apply_factor
-
-            col_wrap = 0
-            if len(frame['Measures'].unique()) > 2:
-                col_wrap = len(frame['Measures'].unique().tolist()) / 2
-
-            fig = interactive_distribution_box(
-                frame, "Bundles", "Value", "Bundles", colormap=bundle_colors,
-                f_column="Measures", column_wrap=int(col_wrap),
-                custom_order={"Measures": custom_order}, figtitle=curr_title,
-                fig_width=args.plot_size[0], fig_height=args.plot_size[1],
-                print_yaxis_range=args.print_yaxis_range,
-                custom_y_range=custom_yaxis)
-
-            outname = curr_method + args.out_name
-
-            save_figures_as(fig, args.out_dir, outname,
-                            save_as_png=args.save_as_png,
-                            dpi_scale=args.dpi_scale,
-                            heigth_value=args.plot_size[1],
-                            width_value=args.plot_size[0])
-
     else:
+        multi_df, df_names = [df], [df['Method'].unique().tolist()[0]]
 
-        single_method = df['Method'].unique().tolist()[0]
-        curr_title = "Distribution of " + single_method + " measurements"
+    jobs = []
+    for frame, curr_method in zip(multi_df, df_names):
+        curr_title = "Boxplot of " + curr_method + " measurements"
+        if not args.split_by:
+            curr_title = "Distribution of " + curr_method + " measurements"
 
         if args.custom_order and args.custom_y is not None:
             custom_order = args.custom_order
+            if args.split_by:
+                custom_order = args.custom_order[curr_method]
             custom_yaxis = args.custom_y
         elif args.use_data:
-            custom_order = df['Measures'].unique().tolist()
+            custom_order = frame['Measures'].unique().tolist()
             custom_yaxis = False
         else:
-            custom_order = order_plot_dict[single_method]
+            custom_order = order_plot_dict[curr_method]
             custom_yaxis = average_parameters_dict
 
+        # Copy the ranges of each figure, they are rescaled when a factor
+        # is applied and the jobs are rendered after the loop
+        custom_yaxis = copy.deepcopy(custom_yaxis)
         if args.apply_factor:
             for metric in custom_order:
                 if metric in scaling_metrics:
                     custom_yaxis[metric][1] *= args.apply_factor
 
         col_wrap = 0
-        if len(df['Measures'].unique()) > 2:
-            col_wrap = len(df['Measures'].unique().tolist()) / 2
+        if len(frame['Measures'].unique()) > 2:
+            col_wrap = len(frame['Measures'].unique().tolist()) / 2
 
-        fig = interactive_distribution_box(
-            df, "Bundles", "Value", "Bundles", colormap=bundle_colors,
+        plot_kwargs = dict(
+            df=frame, x_column="Bundles", y_column="Value",
+            color_column="Bundles", colormap=bundle_colors,
             f_column="Measures", column_wrap=int(col_wrap),
             custom_order={"Measures": custom_order}, figtitle=curr_title,
             fig_width=args.plot_size[0], fig_height=args.plot_size[1],
-            print_yaxis_range=args.print_yaxis_range, custom_y_range=custom_yaxis)
+            print_yaxis_range=args.print_yaxis_range,
+            custom_y_range=custom_yaxis)
+
+        jobs.append(FigureJob(interactive_distribution_box, plot_kwargs,
+                              args.out_dir, curr_method + args.out_name,
+                              save_kwargs))
+
+    return jobs
+
+
+def main():
+    parser = _build_arg_parser()
+    args = parser.parse_args()
 
-        outname = single_method + args.out_name
+    assert_inputs_exist(parser, args.in_csv)
+    nbr_processes = validate_nbr_processes(parser, args)
+
+    # Load Dataframe
+    df = load_df(args.in_csv)
 
-        save_figures_as(fig, args.out_dir, outname,
-                    save_as_png=args.save_as_png, dpi_scale=args.dpi_scale,
-                    heigth_value=args.plot_size[1],
-                    width_value=args.plot_size[0])
+    render_figure_jobs(get_figure_jobs(df, args), nbr_processes)
 
 
 if __name__ == '__main__':
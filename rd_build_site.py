@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Build the CSVs, summary tables and figures of the Read the Doc site from
+TractometryFlow outputs, in a single process (replaces reatdoc_run.sh).
+
+Data are loaded once and shared between the steps :
+    - merge the jsons of all subjects (scil_json_merge_entries.py)
+    - convert the merged jsons (df_convert_json_to_csv.py --save_merge_df)
+    - prepare the data (df_prepare_csv_scil.py --rename_measure --merge_lr)
+    - apply the operations given with --operations (df_operations.py)
+    - split measures and volume data, then split by bundles
+    - generate the summary tables (df_summary_table.py)
+    - generate all figures (rd_heatmap.py, rd_correlation_with_menu.py,
+      rd_distribution_measures.py, rd_boxplot.py, rd_profiles_measures.py)
+
+The steps are available as functions in pipeline/steps.py.
+
+The build is incremental : each step is recorded in out_dir/.build_cache.json
+with a digest of its inputs, parameters and code (including the parameter
+dicts of dataframe/ and plots/, and the dataframe operations). Steps, and
+figures, whose digest did not change and whose outputs exist are skipped.
+The shared plotly.js file is recorded with the figures. Use --rebuild to
+run all steps.
+Steps that run refuse to overwrite existing outputs unless -f is given.
+
+> rd_build_site.py results_tractometry/ readthedoc_results/ --processes 4
+
+Operations json : list of [operation, [arguments]], the arguments are those
+given after the dataframe to the operation. Ex. to rename sessions :
+[["replace_where", [["Sid", "Session"], "sub-003-hc", {"2": "1", "3": "2"}]]]
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from common.io_utils import (add_overwrite_arg, add_processes_arg,
+                             add_shared_plotlyjs_arg, assert_inputs_exist,
+                             assert_outputs_exist, validate_nbr_processes)
+import dataframe.func
+import dataframe.operations
+import dataframe.parameters
+import dataframe.utils
+from dataframe.utils import load_df
+from pipeline.cache import BuildCache, hash_file, hash_object, hash_sources
+from pipeline.steps import (SITE_FOLDERS, apply_operations, convert_jsons,
+                            figure_job_output, figure_job_outputs,
+                            get_outdated_figure_jobs, get_site_figure_jobs,
+                            list_tractometry_jsons,
+                            load_tractometry_jsons, prepare, split_bundles,
+                            split_measures_and_volume, summary_table)
+from plots.render import render_figure_jobs
+
+
+def _build_arg_parser():
+    p = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
+                                description=__doc__)
+    p.add_argument('in_tractometry',
+                   help='Folder of TractometryFlow results.')
+    p.add_argument('out_dir',
+                   help='Output directory of the site.')
+
+    p.add_argument('--out_name', default='rtd_',
+                   help='Filename prefix of the CSV outputs. [%(default)s]')
+    p.add_argument('--operations',
+                   help='Json file of the operations applied on average and '
+                        'profile data.')
+
+    prep = p.add_argument_group(title='Prepare options')
+    prep.add_argument('--longitudinal', default='_ses-',
+                      help='Separator used to split Sid column in Sid and '
+                           'Session. [%(default)s]')
+    prep.add_argument('--apply_factor', type=int, default=100,
+                      help='Factor applied on MRI measure for plot. '
+                           '[%(default)s]')
+    prep.add_argument('--compute_ecvf', action='store_true',
+                      help='Compute ECVF using ICVF from dataframe. '
+                           'Not recommended.')
+
+    fig = p.add_argument_group(title='Figures options')
+    fig.add_argument('--save_as_png', action='store_true',
+                     help='Save plot as png. Require kaleido.')
+    add_shared_plotlyjs_arg(fig, relative_to='the figure folder')
+
+    p.add_argument('--rebuild', action='store_true',
+                   help='Ignore the build cache and run all steps.')
+
+    add_processes_arg(p)
+    add_overwrite_arg(p)
+
+    return p
+
+
+def main():
+    parser = _build_arg_parser()
+    args = parser.parse_args()
+
+    assert_inputs_exist(parser, [], args.operations)
+    if not os.path.isdir(args.in_tractometry):
+        parser.error('{} is not a directory.'.format(args.in_tractometry))
+    nbr_processes = validate_nbr_processes(parser, args)
+
+    for folder in SITE_FOLDERS:
+        os.makedirs(os.path.join(args.out_dir, folder), exist_ok=True)
+
+    cache = BuildCache(os.path.join(args.out_dir, '.build_cache.json'),
+                       rebuild=args.rebuild)
+
+    operations = []
+    if args.operations:
+        with open(args.operations) as f:
+            operations = json.load(f)
+
+    # Inputs are hashed with their path relative to in_tractometry
+    in_jsons = list_tractometry_jsons(args.in_tractometry)
+    convert_digest = hash_object(
+        hash_sources(dataframe.func, dataframe.parameters),
+        [(key, [(os.path.relpath(curr, args.in_tractometry), hash_file(curr))
+                for curr in curr_jsons])
+         for key, curr_jsons in in_jsons.items()])
+    long_csv = os.path.join(args.out_dir, 'convert_to_csv',
+                            'merged_csv_long.csv')
+
+    prepare_kwargs = dict(rename_measure=True, merge_lr=True,
+                          longitudinal=args.longitudinal,
+                          compute_ecvf=args.compute_ecvf,
+                          apply_factor=args.apply_factor)
+    prepare_digest = hash_object(convert_digest,
+                                 hash_sources(dataframe.operations,
+                                              dataframe.utils),
+                                 prepare_kwargs, operations, args.out_name)
+    csv_dir = os.path.join(args.out_dir, 'csv_data')
+    csv_names = ['average_measures', 'profile_measures',
+                 'average_volume', 'profile_volume']
+    csv_files = [os.path.join(csv_dir, args.out_name + name + '.csv')
+                 for name in csv_names]
+
+    if cache.is_up_to_date('prepare', prepare_digest):
+        print("CSV data are up to date")
+        csv_data = {name: load_df(filename)
+                    for name, filename in zip(csv_names, csv_files)}
+    else:
+        if cache.is_up_to_date('convert', convert_digest):
+            print("Converted jsons are up to date")
+            long_df = pd.read_csv(long_csv)
+        else:
+            assert_outputs_exist(parser, args, long_csv)
+            print("Merge and convert tractometryflow jsons")
+            long_df = convert_jsons(load_tractometry_jsons(in_jsons))
+            long_df.to_csv(long_csv, index=False)
+            cache.record('convert', convert_digest, [long_csv])
+            cache.save()
+
+        assert_outputs_exist(parser, args, csv_files)
+        print("Prepare CSV")
+        average, profile = prepare(long_df, **prepare_kwargs)
+        if operations:
+            average = apply_operations(average, operations)
+            profile = apply_operations(profile, operations)
+
+        csv_data = {}
+        for name, df in [('average', average), ('profile', profile)]:
+            measures, volume = split_measures_and_volume(df)
+            csv_data[name + '_measures'] = measures
+            csv_data[name + '_volume'] = volume
+        # Reload the written CSVs, figures get the same data (and digests)
+        # whether this step is skipped or not
+        for name, filename in zip(csv_names, csv_files):
+            csv_data[name].to_csv(filename, index=False)
+            csv_data[name] = load_df(filename)
+        cache.record('prepare', prepare_digest, csv_files)
+        cache.save()
+
+    bundles = {}
+    bundle_outputs = []
+    for name in csv_names:
+        for bundle, bundle_df in split_bundles(csv_data[name]).items():
+            bundle_csv = os.path.join(args.out_dir, 'bundles',
+                                      bundle + '_' + name + '.csv')
+            table_csv = None
+            if name == 'average_measures':
+                bundles[bundle] = bundle_df
+                table_csv = os.path.join(args.out_dir, 'tables',
+                                         bundle + '_' + name + '_table.csv')
+            bundle_outputs.append((bundle_df, bundle_csv, table_csv))
+
+    if cache.is_up_to_date('bundles', prepare_digest):
+        print("Bundle CSVs and summary tables are up to date")
+    else:
+        outputs = [curr for _, bundle_csv, table_csv in bundle_outputs
+                   for curr in [bundle_csv, table_csv] if curr]
+        assert_outputs_exist(parser, args, outputs)
+        print("Generate bundle CSVs and summary tables")
+        for bundle_df, bundle_csv, table_csv in bundle_outputs:
+            bundle_df.to_csv(bundle_csv, index=False)
+            if table_csv:
+                summary_table(bundle_df).to_csv(table_csv)
+        cache.record('bundles', prepare_digest, outputs)
+        cache.save()
+
+    figure_args = []
+    if args.save_as_png:
+        figure_args.append('--save_as_png')
+    if args.shared_plotlyjs:
+        figure_args += ['--shared_plotlyjs', args.shared_plotlyjs]
+
+    jobs = get_site_figure_jobs(csv_data, bundles, args.out_dir,
+                                figure_args=figure_args)
+    outdated_jobs, digests = get_outdated_figure_jobs(jobs, cache)
+    print("Generate figures ({} of {} outdated)".format(len(outdated_jobs),
+                                                        len(jobs)))
+    if outdated_jobs:
+        assert_outputs_exist(parser, args, [figure_job_output(job)
+                                            for job in outdated_jobs])
+        render_figure_jobs(outdated_jobs, nbr_processes)
+        for job, digest in zip(outdated_jobs, digests):
+            cache.record(figure_job_output(job), digest,
+                         figure_job_outputs(job))
+        cache.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,9 +10,11 @@ import pandas as pd
 
 from dataframe.func import split_df_by, pivot_to_wide
 from dataframe.utils import load_df
-from plots.utils import save_figures_as
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_processes_arg,
+                             add_shared_plotlyjs_arg, assert_inputs_exist,
+                             validate_nbr_processes)
 from plots.scatter import multi_correlation_with_menu
+from plots.render import FigureJob, render_figure_jobs
 
 
 def _build_arg_parser():
@@ -57,43 +59,67 @@ def _build_arg_parser():
     plot.add_argument('--trendline_color', default='black',
                            help='Color of regression line. [%(default)s]')
 
+    add_shared_plotlyjs_arg(p)
+    add_processes_arg(p)
     add_overwrite_arg(p)
 
     return p
 
 
-def main():
-    parser = _build_arg_parser()
-    args = parser.parse_args()
+def get_figure_jobs(df, args):
+    """
+    Reshape the dataframe according to the script options and list the
+    figures to render.
 
-    assert_inputs_exist(parser, args.in_csv)
+    df:     Dataframe loaded from in_csv.
+    args:   Arguments of the script.
 
+    Return  List of FigureJob.
+    """
+    # Defaults are set here, rd_build_site.py lists the figures without
+    # calling main()
     if args.out_dir is None:
         args.out_dir = './'
 
-    # Load Data frame
-    df = load_df(args.in_csv)
-
     df = df.loc[(df.Statistics == args.use_stats) &
                 (df.rbx_version == args.rbx_version)].reset_index(drop=True)
 
+    save_kwargs = dict(save_as_png=args.save_as_png,
+                       shared_plotlyjs=args.shared_plotlyjs)
+
+    jobs = []
     if args.split_by:
         multi_df, df_names = split_df_by(df, args.split_by)
         for frame, curr_name in zip(multi_df, df_names):
             frame = pivot_to_wide(frame, 'Sid', 'Measures', 'Value',
                                   longitudinal=args.longitudinal)
             frame = frame.set_index(frame.columns.tolist()[0])
-            fig = multi_correlation_with_menu(
-                        frame, column_list=args.use_columns,
+            plot_kwargs = dict(
+                        df=frame, column_list=args.use_columns,
                         trend=args.trendtype, scope=args.trendscope,
                         colorline=args.trendline_color,
                         fig_width=args.plot_size[0],
                         fig_height=args.plot_size[1])
 
-            outname = curr_name + args.out_name
+            jobs.append(FigureJob(multi_correlation_with_menu, plot_kwargs,
+                                  args.out_dir, curr_name + args.out_name,
+                                  save_kwargs))
+
+    return jobs
+
+
+def main():
+    parser = _build_arg_parser()
+    args = parser.parse_args()
+
+    assert_inputs_exist(parser, args.in_csv)
+    nbr_processes = validate_nbr_processes(parser, args)
+
+    # Load Data frame
+    df = load_df(args.in_csv)
+
+    render_figure_jobs(get_figure_jobs(df, args), nbr_processes)
 
-            save_figures_as(fig, args.out_dir, outname,
-                            save_as_png=args.save_as_png)
 
 if __name__ == '__main__':
     main()
@@ -15,7 +15,7 @@ from plotly.subplots import make_subplots
 import plotly.graph_objs as go
 import plotly.express as px
 
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import add_overwrite_arg, assert_inputs_exist
 from plots.utils import average_parameters, metric_colors
 
 
@@ -6,9 +6,25 @@ Generates a GIF from MRI images (--in_mri) or list of png (--in_png).
 
 For MRI images, any 3D image can be used.The GIF is built along the z axis,
 by default the first 4 slice of z and the last 5 are ignored.
-To change this setting, use the --z_range option.
+To change this setting, use the --z_range option. For 4D images, the volume
+is selected with --volume_index.
+
+The image is memory mapped and read slice by slice, only the slices of the
+GIF are loaded.
+
+With --in_memory, the slices are colored with the colormap in numpy and the
+frames are written directly in the GIF, without the PNG files of matplotlib.
+Frames are at the resolution of the image, use --upscale to enlarge them.
 
 generate_gif.py --in_mri fa.nii.gz
+generate_gif.py --in_mri fa.nii.gz --in_memory --upscale 3
+generate_gif.py --in_mris 'results/*/*__fa.nii.gz' --processes 8
+
+With --in_mris, a GIF is generated for each image (list of files or quoted
+glob patterns) in a pool of processes, using the --in_memory rendering. GIFs
+are named from the images (with their folders if names are not unique).
+A GIF whose image (size and modification time) and options did not change
+since it was generated is skipped, use -f to generate all GIFs.
 generate_gif.py --in_png ./AF (path containing multiple PNGs)
 
 Note :
@@ -25,20 +41,27 @@ Examples :
 """
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 import glob
 import os
 import shutil
 
-import imageio
-import matplotlib
-import matplotlib.pyplot as plt
-import nibabel as nib
 import numpy as np
-import scipy.ndimage as ndimage
 
-from scilpy.io.utils import (add_overwrite_arg,
-                             assert_output_dirs_exist_and_empty)
-from scilpy.utils.filenames import split_name_with_nii
+from common.io_utils import (add_overwrite_arg, add_processes_arg,
+                             assert_output_dirs_exist_and_empty,
+                             split_name_with_nii, validate_nbr_processes)
+from common.lazy import lazy_import
+from common.nifti import check_volume_index, get_slice, load_image
+
+imageio = lazy_import('imageio')
+matplotlib = lazy_import('matplotlib')
+plt = lazy_import('matplotlib.pyplot')
+ndimage = lazy_import('scipy.ndimage')
+cache = lazy_import('pipeline.cache')
+
+# Lookup table shared by the workers of --in_mris.
+_WORKER_LUT = None
 
 
 def _build_arg_p():
@@ -50,11 +73,15 @@ def _build_arg_p():
                          help='Single MRI image.')
     im_type.add_argument('--in_png',
                          help='Path to PNG images.')
+    im_type.add_argument('--in_mris', nargs='+',
+                         help='MRI images or glob patterns, one GIF by '
+                              'image.')
 
     p.add_argument('--out_dir',
                    help='Output directory to save GIF.')
     p.add_argument('--out_prefix',
-                   help='Prefix used to generate GIF png images. ')
+                   help='Prefix used to generate GIF png images. '
+                        'With --in_mris, added to the name of each GIF.')
 
     gif_opts = p.add_argument_group(title='GIF options')
     gif_opts.add_argument('--delay', type=int, default=20,
@@ -69,6 +96,9 @@ def _build_arg_p():
                           metavar=('Min', 'Max'),
                           help='Minimum and maximum z-axis values used to '
                                'create the GIF. ')
+    mri_opts.add_argument('--volume_index', type=int,
+                          help='Volume used to create the GIF for 4D images. '
+                               '[0]')
     mri_opts.add_argument('--color_map', default='gray',
                           choices={'gray', 'jet'},
                           help='Specify colormap use for GIF. [%(default)s]')
@@ -78,7 +108,15 @@ def _build_arg_p():
     mri_opts.add_argument('--keep_tmp_files', action='store_true',
                           help='Use this option to save PNGs. By default, the '
                                'PNG files for each slice are not preserved.')
-
+    mri_opts.add_argument('--in_memory', action='store_true',
+                          help='Render the frames in memory, without PNG '
+                               'files (--dpi and --keep_tmp_files are '
+                               'ignored).')
+    mri_opts.add_argument('--upscale', type=int, default=1,
+                          help='Enlarge the frames of --in_memory by this '
+                               'factor (nearest neighbour). [%(default)s]')
+
+    add_processes_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -104,29 +142,258 @@ def custom_color_for_nii(colors, col_range=200):
                                                                stack_colmap)
 
 
-def generate_individual_image_plot(data, map_prefix, slices_order,
-                                   colmap, out_dir):
+def get_colormap_lut(colmap):
+    """
+    Sample a matplotlib colormap into a lookup table.
+
+    colmap:     Matplotlib colormap (see custom_color_for_nii).
+
+    Returns an array (colmap.N, 3) of RGB colors in uint8.
+    """
+    colors = colmap(np.arange(colmap.N))[:, :3]
+    return np.round(colors * 255).astype(np.uint8)
+
+
+def slice_to_frame(data, lut, upscale=1):
+    """
+    Color a slice with a lookup table, as displayed by
+    generate_individual_image_plot (rotated of -90 degrees, origin at the
+    bottom, intensities normalized between the min and max of the slice).
+
+    data:       2D array of the slice.
+    lut:        Lookup table (see get_colormap_lut).
+    upscale:    Factor used to enlarge the frame (nearest neighbour).
+
+    Returns an RGB frame in uint8.
+    """
+    data = np.nan_to_num(data)
+    data = np.flipud(np.rot90(data, k=-1))
+
+    # Same normalization and color indexing as matplotlib
+    v_min, v_max = data.min(), data.max()
+    if v_max > v_min:
+        data = (data - v_min) / (v_max - v_min)
+    else:
+        data = np.zeros_like(data)
+    index = np.clip((data * len(lut)).astype(np.intp), 0, len(lut) - 1)
+    frame = lut[index]
+
+    if upscale > 1:
+        frame = frame.repeat(upscale, axis=0).repeat(upscale, axis=1)
+    return frame
+
+
+def iter_mri_frames(img, slices_order, lut, volume_index=None, upscale=1):
+    """
+    Generates the GIF frames of a Niifti image on the z axis, one slice is
+    read at a time.
+
+    img:            nibabel image (see common.nifti.load_image).
+    slices_order:   List of numbers corresponding to the z-axis slice used to
+                    generate the frames.
+    lut:            Lookup table (see get_colormap_lut).
+    volume_index:   Volume used for 4D images.
+    upscale:        Factor used to enlarge the frames.
+
+    Yields RGB frames in uint8.
+    """
+    for slice_z in slices_order:
+        yield slice_to_frame(get_slice(img, slice_z, volume_index), lut,
+                             upscale=upscale)
+
+
+def get_z_slices(z_size, z_range=None):
+    """
+    List the z-axis slices of the GIF, by default the first 4 slices and the
+    last 5 are ignored.
+
+    z_size:     Number of slices of the image on the z axis.
+    z_range:    Minimum and maximum z-axis values.
+
+    Returns an array of slice numbers.
+    """
+    if z_range is not None:
+        z_min, z_max = z_range
+    else:
+        z_min, z_max = 4, z_size - 5
+    return np.linspace(z_min, z_max, num=z_max-z_min).astype(int)
+
+
+def get_color_map(color_map):
+    """Return the colormap of the GIF from its name (gray or jet)."""
+    if color_map == 'jet':
+        return custom_color_for_nii(plt.cm.jet)
+    return custom_color_for_nii(plt.cm.gray)
+
+
+def write_gif(out_file, frames, fps=20, loop=0):
+    """
+    Write frames in a GIF, frames are appended one at a time.
+
+    out_file:   Output GIF filename.
+    frames:     Iterable of frames (arrays).
+    fps:        Number of frames per second.
+    loop:       Number of loops, 0 to loop forever.
+    """
+    with imageio.get_writer(out_file, mode='I', fps=fps,
+                            loop=loop) as writer:
+        for frame in frames:
+            writer.append_data(frame)
+
+
+def render_mri_gif(in_mri, out_file, lut, z_range=None, volume_index=None,
+                   upscale=1, fps=20, loop=0):
+    """
+    Generates the GIF of a Niifti image with the in memory rendering.
+
+    in_mri:         Niifti image.
+    out_file:       Output GIF filename.
+    lut:            Lookup table (see get_colormap_lut).
+    z_range:        Minimum and maximum z-axis values.
+    volume_index:   Volume used for 4D images.
+    upscale:        Factor used to enlarge the frames.
+    fps, loop:      GIF options (see write_gif).
+    """
+    img = load_image(in_mri)
+    volume_index = check_volume_index(img, volume_index)
+    write_gif(out_file,
+              iter_mri_frames(img, get_z_slices(img.shape[2], z_range), lut,
+                              volume_index=volume_index, upscale=upscale),
+              fps=fps, loop=loop)
+
+
+def _init_gif_worker(lut):
+    """Initialize a worker process with the lookup table of the GIFs."""
+    global _WORKER_LUT
+    _WORKER_LUT = lut
+
+
+def _render_gif_job(job):
+    """Render a job of --in_mris in a worker, return the error message or
+    None."""
+    in_mri, out_file, kwargs = job
+    try:
+        render_mri_gif(in_mri, out_file, _WORKER_LUT, **kwargs)
+    except Exception as msg:
+        return str(msg)
+    return None
+
+
+def list_batch_images(patterns):
+    """
+    List the images of --in_mris, glob patterns are expanded.
+
+    Returns a sorted list of unique filenames.
+    """
+    in_files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        in_files.update(matches if matches else [pattern])
+    return sorted(in_files)
+
+
+def get_batch_prefixes(in_files):
+    """
+    Name the GIF of each image from its filename. If filenames are not
+    unique (ex. fa.nii.gz of each subject), their folders relative to the
+    common path of all images are added to the name.
+
+    Returns a list of prefixes in the order of in_files.
+    """
+    prefixes = [split_name_with_nii(os.path.basename(curr))[0]
+                for curr in in_files]
+    if len(set(prefixes)) == len(prefixes) or len(in_files) < 2:
+        return prefixes
+
+    common_path = os.path.commonpath([os.path.abspath(curr)
+                                      for curr in in_files])
+    return [split_name_with_nii(os.path.relpath(os.path.abspath(curr),
+                                                common_path))[0].replace(
+                                                    os.sep, '_')
+            for curr in in_files]
+
+
+def generate_batch_gifs(in_files, out_dir, lut, gif_kwargs, nbr_processes=1,
+                        overwrite=False, out_prefix=None):
+    """
+    Generates the GIF of several Niifti images in a pool of processes.
+    GIFs whose image and options did not change since their generation are
+    skipped (manifest out_dir/.gif_cache.json).
+
+    in_files:       List of Niifti images.
+    out_dir:        Output directory of the GIFs.
+    lut:            Lookup table shared by all GIFs (see get_colormap_lut).
+    gif_kwargs:     Options of render_mri_gif (z_range, volume_index,
+                    upscale, fps, loop).
+    nbr_processes:  Number of processes.
+    overwrite:      If True, all GIFs are generated.
+    out_prefix:     Prefix added to the name of each GIF.
+
+    Returns a dictionary of error messages by image, for the failed GIFs.
+    """
+    gif_cache = cache.BuildCache(os.path.join(out_dir, '.gif_cache.json'),
+                                 rebuild=overwrite)
+
+    jobs, digests = [], []
+    for in_mri, prefix in zip(in_files, get_batch_prefixes(in_files)):
+        out_file = os.path.join(out_dir, (out_prefix or '') + prefix + '.gif')
+        stat = os.stat(in_mri)
+        digest = cache.hash_object(os.path.abspath(in_mri), stat.st_size,
+                                   stat.st_mtime_ns, lut, gif_kwargs)
+        if not gif_cache.is_up_to_date(out_file, digest):
+            jobs.append((in_mri, out_file, gif_kwargs))
+            digests.append(digest)
+    print('Generate GIFs ({} of {} outdated)'.format(len(jobs),
+                                                     len(in_files)))
+
+    if nbr_processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(nbr_processes, len(jobs)),
+                                 initializer=_init_gif_worker,
+                                 initargs=(lut,)) as executor:
+            results = list(executor.map(_render_gif_job, jobs))
+    else:
+        _init_gif_worker(lut)
+        results = [_render_gif_job(job) for job in jobs]
+
+    errors = {}
+    for (in_mri, out_file, _), digest, error in zip(jobs, digests, results):
+        if error is None:
+            gif_cache.record(out_file, digest, [out_file])
+        else:
+            errors[in_mri] = error
+    gif_cache.save()
+    return errors
+
+
+def generate_individual_image_plot(img, map_prefix, slices_order,
+                                   colmap, out_dir, volume_index=None,
+                                   dpi=200):
     """
     Generates multiple PNG images from a Niifti image on the z axis.
 
+    img:            nibabel image, slices are read one at a time
+                    (see common.nifti.load_image).
     map_prefix:     Prefix used to name PNG files.
     slices_order:   List of numbers corresponding to the z-axis slice used to
                     generate PNG files.
     colmap:         Color map used to generate PNG files.
     out_dir:        Output directory for saving PNG files.
+    volume_index:   Volume used for 4D images.
+    dpi:            Resolution of the PNG files.
 
     Returns a folder containing the number of PNGs corresponding to the slice listed in slices_order and in z-axis.
 
     """
     for slice_z in slices_order:
         fig, ax = plt.subplots(1, 1)
-        image = ax.imshow(ndimage.rotate(data[:, :, slice_z], -90),
+        data = get_slice(img, slice_z, volume_index)
+        image = ax.imshow(ndimage.rotate(data, -90),
                           cmap=colmap, origin='lower')
         ax.axis('off')
         ax.set_facecolor('k')
         out_name = map_prefix + '_slice_' + str(slice_z) + '.png'
         plt.savefig(os.path.join(out_dir, out_name), facecolor='k',
-                    dpi=200, bbox_inches='tight')
+                    dpi=dpi, bbox_inches='tight')
         plt.close()
 
 
@@ -136,6 +403,31 @@ def main():
 
     if args.out_dir is None:
         args.out_dir = './'
+    if args.upscale < 1:
+        p.error('--upscale must be >= 1.')
+
+    if args.in_mris:
+        in_files = list_batch_images(args.in_mris)
+        missing = [curr for curr in in_files if not os.path.isfile(curr)]
+        if missing:
+            p.error('Input file {} does not exist'.format(missing[0]))
+        if not os.path.isdir(args.out_dir):
+            p.error('Output directory {} doesn\'t exist.'.format(
+                args.out_dir))
+        nbr_processes = validate_nbr_processes(p, args)
+
+        lut = get_colormap_lut(get_color_map(args.color_map))
+        gif_kwargs = dict(z_range=args.z_range,
+                          volume_index=args.volume_index,
+                          upscale=args.upscale, fps=args.delay,
+                          loop=args.loop)
+        errors = generate_batch_gifs(in_files, args.out_dir, lut, gif_kwargs,
+                                     nbr_processes=nbr_processes,
+                                     overwrite=args.overwrite,
+                                     out_prefix=args.out_prefix)
+        for in_mri, error in errors.items():
+            print('GIF of {} failed: {}'.format(in_mri, error))
+        return
 
     if args.in_png:
         # List and sort png files
@@ -145,54 +437,54 @@ def main():
         if args.out_prefix is None:
             args.out_prefix = (os.path.splitext(
                                             os.path.basename(png_list[0]))[0])
-        # Load each PNG files in variable.
-        frames = []
-        for curr_png in png_list:
-            frames.append(imageio.imread(curr_png))
+        # Load each PNG file while writing the GIF.
+        frames = (imageio.imread(curr_png) for curr_png in png_list)
 
     if args.in_mri:
-        assert_output_dirs_exist_and_empty(p, args,
-                                           os.path.join(args.out_dir, 'tmp'),
-                                           create_dir=True)
+        if not args.in_memory:
+            assert_output_dirs_exist_and_empty(
+                p, args, os.path.join(args.out_dir, 'tmp'), create_dir=True)
 
         if args.out_prefix is None:
             args.out_prefix = split_name_with_nii(
                 os.path.basename(args.in_mri))[0]
 
-        img_data = nib.load(args.in_mri).get_fdata(dtype=np.float32)
-
-        if args.z_range is not None:
-            z_min = args.z_range[0]
-            z_max = args.z_range[1]
-        else:
-            z_min = 4
-            z_max = img_data.shape[2] - 5
-
-        if args.color_map == 'jet':
-            use_color = plt.cm.jet
-        else:
-            use_color = plt.cm.gray
+        img = load_image(args.in_mri)
+        try:
+            volume_index = check_volume_index(img, args.volume_index)
+        except ValueError as msg:
+            p.error(str(msg))
 
         # Creates list of number of slice in z axis.
-        z_slices = np.linspace(z_min, z_max, num=z_max-z_min).astype(int)
-        # Generate PNG files.
-        generate_individual_image_plot(img_data, args.out_prefix, z_slices,
-                                       custom_color_for_nii(use_color),
-                                       os.path.join(args.out_dir, 'tmp'))
-        # Load each PNG file in variable.
-        frames = []
-        for z in z_slices:
-            image_name = args.out_prefix + '_slice_' + str(z) + '.png'
-            frames.append(imageio.imread(os.path.join(
-                                         args.out_dir, 'tmp', image_name)))
-
-        if not args.keep_tmp_files:
-            shutil.rmtree(os.path.join(args.out_dir, 'tmp'),
-                          ignore_errors=False, onerror=None)
+        z_slices = get_z_slices(img.shape[2], args.z_range)
+        colmap = get_color_map(args.color_map)
+
+        if args.in_memory:
+            # Frames are colored and written in the GIF slice by slice.
+            frames = iter_mri_frames(img, z_slices, get_colormap_lut(colmap),
+                                     volume_index=volume_index,
+                                     upscale=args.upscale)
+        else:
+            # Generate PNG files.
+            generate_individual_image_plot(img, args.out_prefix, z_slices,
+                                           colmap,
+                                           os.path.join(args.out_dir, 'tmp'),
+                                           volume_index=volume_index,
+                                           dpi=args.dpi)
+            # Load each PNG file in variable.
+            frames = []
+            for z in z_slices:
+                image_name = args.out_prefix + '_slice_' + str(z) + '.png'
+                frames.append(imageio.imread(os.path.join(
+                                             args.out_dir, 'tmp', image_name)))
+
+            if not args.keep_tmp_files:
+                shutil.rmtree(os.path.join(args.out_dir, 'tmp'),
+                              ignore_errors=False, onerror=None)
 
     # Save Gif
-    imageio.mimsave(os.path.join(args.out_dir, args.out_prefix + '.gif'),
-                    frames, fps=args.delay, loop=args.loop)
+    write_gif(os.path.join(args.out_dir, args.out_prefix + '.gif'), frames,
+              fps=args.delay, loop=args.loop)
 
 
 if __name__ == "__main__":
@@ -15,16 +15,19 @@ Warning : Require kaleido to save in png.
 
 import argparse
 
-import plotly.express as px
-
 from dataframe.func import (get_multi_corr_map, get_corr_map,
                             add_average_from_longitudinal)
 from dataframe.utils import get_row_name_from_col, load_df
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_processes_arg,
+                             add_shared_plotlyjs_arg, assert_inputs_exist,
+                             validate_nbr_processes)
 from plots.parameters import new_order_measure
-from plots.utils import (save_figures_as, generate_reorder_list,
-                         check_agreement_with_dict)
+from plots.utils import generate_reorder_list, check_agreement_with_dict
 from plots.heatmap import interactive_heatmap, interactive_heatmap_with_slider
+from plots.render import FigureJob, render_figure_jobs
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
 
 
 def _build_arg_parser():
@@ -99,25 +102,30 @@ def _build_arg_parser():
                            help='Y axis title of correlation heatmap. '
                                 '[%(default)s]')
 
+    add_shared_plotlyjs_arg(p)
+    add_processes_arg(p)
     add_overwrite_arg(p)
 
     return p
 
 
-def main():
-    parser = _build_arg_parser()
-    args = parser.parse_args()
+def get_figure_jobs(df, args):
+    """
+    Compute the correlation maps according to the script options and list
+    the figures to render.
 
-    assert_inputs_exist(parser, args.in_csv)
+    df:     Dataframe loaded from in_csv.
+    args:   Arguments of the script.
 
+    Return  List of FigureJob.
+    """
+    # Defaults are set here, rd_build_site.py lists the figures without
+    # calling main()
     if args.out_dir is None:
         args.out_dir = './'
-
     if args.colormap is None:
         args.colormap = px.colors.sequential.YlGnBu
 
-    # Load and Filter dataframe for figure
-    df = load_df(args.in_csv)
     df = df[df['Statistics'] == args.use_stats]
 
     if args.custom_reorder is not None:
@@ -140,6 +148,10 @@ def main():
     # Generate merged column for pivot
     df['Measures_Bundles'] = df['Measures'] + '_' + df['Bundles']
 
+    save_kwargs = dict(is_slider=args.use_as_slider,
+                       save_as_png=args.save_as_png,
+                       shared_plotlyjs=args.shared_plotlyjs)
+
     # Generate Heatmap
     if args.split_by:
         split_arg_names = get_row_name_from_col(df, args.split_by)
@@ -148,24 +160,25 @@ def main():
             reorder_col=new_order, longitudinal=args.longitudinal,
             post_pearson=args.apply_on_pearson))
 
+        jobs = []
         for corr_name, corr in zip(split_arg_names, corr_map):
-            if args.ylabel is None:
-                args.ylabel = 'Metrics of ' + args.split_by + ' ' + str(
+            y_label = args.ylabel
+            if y_label is None:
+                y_label = 'Metrics of ' + args.split_by + ' ' + str(
                     corr_name)
-            fig = interactive_heatmap(
-                corr, title=args.title, title_size=25, tick_angle=90,
-                colbar_title=colorbar_title, tick_font_size=12,
-                colormap=px.colors.sequential.YlGnBu,
+            plot_kwargs = dict(
+                corr_map=corr, title=args.title, title_size=25,
+                tick_angle=90, colbar_title=colorbar_title,
+                tick_font_size=12, colormap=args.colormap,
                 r_min=args.r_range[0], r_max=args.r_range[1],
-                y_label=args.ylabel, fig_width=args.plot_size[0],
+                y_label=y_label, fig_width=args.plot_size[0],
                 fig_height=args.plot_size[1])
 
-            # Save figure
             outname = args.out_name + '_' + args.split_by + '_' + str(
                 corr_name)
-            save_figures_as(fig, args.out_dir, outname,
-                            is_slider=args.use_as_slider,
-                            save_as_png=args.save_as_png)
+            jobs.append(FigureJob(interactive_heatmap, plot_kwargs,
+                                  args.out_dir, outname, save_kwargs))
+        return jobs
 
     # Heatmap with slider
     if args.use_as_slider:
@@ -177,38 +190,46 @@ def main():
             post_pearson=args.apply_on_pearson,
             longitudinal=args.longitudinal)
 
-        # Generate figure
-        fig = interactive_heatmap_with_slider(
-            corr_map, corr_map_names, title=args.title,
-            colbar_title=colorbar_title, colormap=px.colors.sequential.YlGnBu,
-            tick_angle=90, y_label=args.ylabel, tick_font_size=12,
-            title_size=25, r_min=args.r_range[0], r_max=args.r_range[1],
-            fig_width=args.plot_size[0],
+        plot_kwargs = dict(
+            corr_dfs=corr_map, corr_dfs_names=corr_map_names,
+            title=args.title, colbar_title=colorbar_title,
+            colormap=args.colormap, tick_angle=90, y_label=args.ylabel,
+            tick_font_size=12, title_size=25, r_min=args.r_range[0],
+            r_max=args.r_range[1], fig_width=args.plot_size[0],
             fig_height=args.plot_size[1])
 
-        args.out_name = args.out_name + '_with_slider'
+        return [FigureJob(interactive_heatmap_with_slider, plot_kwargs,
+                          args.out_dir, args.out_name + '_with_slider',
+                          dict(save_kwargs, play=args.autoplay))]
 
-    else:
-        # Heatmap without slider (i.e. averaged values)
-        corr_map, colorbar_title = get_corr_map(
-            df, 'Sid', 'Measures_Bundles', 'Value',
-            reorder_col=new_order,
-            post_pearson=args.apply_on_pearson)
-        # Generate figure
-        fig = interactive_heatmap(
-            corr_map, title=args.title, title_size=25, tick_angle=90,
-            colbar_title=colorbar_title, colormap=px.colors.sequential.YlGnBu,
-            x_label=args.xlabel, y_label=args.ylabel, r_min=args.r_range[0],
-            r_max=args.r_range[1], tick_font_size=12,
-            fig_width=args.plot_size[0], fig_height=args.plot_size[1])
-
-    # Save figure
-    if args.split_by is not None:
-        pass
-    else:
-        save_figures_as(fig, args.out_dir, args.out_name,
-                        is_slider=args.use_as_slider,
-                        save_as_png=args.save_as_png, play=args.autoplay)
+    # Heatmap without slider (i.e. averaged values)
+    corr_map, colorbar_title = get_corr_map(
+        df, 'Sid', 'Measures_Bundles', 'Value',
+        reorder_col=new_order,
+        post_pearson=args.apply_on_pearson)
+
+    plot_kwargs = dict(
+        corr_map=corr_map, title=args.title, title_size=25, tick_angle=90,
+        colbar_title=colorbar_title, colormap=args.colormap,
+        x_label=args.xlabel, y_label=args.ylabel, r_min=args.r_range[0],
+        r_max=args.r_range[1], tick_font_size=12,
+        fig_width=args.plot_size[0], fig_height=args.plot_size[1])
+
+    return [FigureJob(interactive_heatmap, plot_kwargs, args.out_dir,
+                      args.out_name, dict(save_kwargs, play=args.autoplay))]
+
+
+def main():
+    parser = _build_arg_parser()
+    args = parser.parse_args()
+
+    assert_inputs_exist(parser, args.in_csv)
+    nbr_processes = validate_nbr_processes(parser, args)
+
+    # Load dataframe
+    df = load_df(args.in_csv)
+
+    render_figure_jobs(get_figure_jobs(df, args), nbr_processes)
 
 
 if __name__ == '__main__':
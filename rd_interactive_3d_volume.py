@@ -3,7 +3,20 @@
 
 """
 Script to generate an interactive visualization of MRI images.
-It's best to crop the images first.
+It's best to crop the images first. For 4D images, the volume is selected
+with --volume_index.
+
+To reduce the size of the html page, slices can be downsampled
+(--downsample), intensities quantized to 256 levels (--quantize, with a fixed
+range given by --color_range) and only one slice out of --z_stride added
+to the slider. With --shared_geometry, the z plane is not repeated in each
+frame, the html size is about halved.
+> rd_interactive_3d_volume.py fa.nii.gz --downsample 2 --quantize --z_stride 2
+
+With --triplanar, the sagittal, coronal and axial slices are displayed side by
+side with a slider each. The slices are written as binary files in the folder
+OUT_HTML_slices next to the html and loaded when a slider moves, the page
+must be served over http (ex. python -m http.server).
 
 
 List of available colors: Blackbody, Bluered, Blues, Vividis, Earth, Electric,
@@ -15,16 +28,18 @@ List of available colors: Blackbody, Bluered, Blues, Vividis, Earth, Electric,
 import argparse
 import os
 
-import nibabel as nib
 import numpy as np
 
-from plots.parameters import colormap_3d_volume
 from plots.utils import save_figures_as
-from plots.three_dimension import generate_3d_volume
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
-from scilpy.utils.filenames import split_name_with_nii
+from plots.three_dimension import (downsample_volume, generate_3d_volume,
+                                   quantize_volume)
+from plots.triplanar import generate_triplanar_view
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
+                             assert_inputs_exist, assert_outputs_exist,
+                             assert_output_dirs_exist_and_empty,
+                             split_name_with_nii)
+from common.nifti import check_volume_index, get_slices, load_image
 
-import matplotlib.cm as cm
 
 def _build_arg_parser():
     p = argparse.ArgumentParser(description=__doc__,
@@ -38,6 +53,13 @@ def _build_arg_parser():
     p.add_argument('--out_dir',
                    help='Output directory to save html page.')
 
+    p.add_argument('--volume_index', type=int,
+                   help='Volume displayed for 4D images. [0]')
+    p.add_argument('--triplanar', action='store_true',
+                   help='Tri-planar view with slices loaded on demand. '
+                        'Only --title,\n--colorname, --color_range and '
+                        '--display_scale are used.')
+
     visu = p.add_argument_group(title='visualization options')
     visu.add_argument('--title', default='Brain MRI',
                       help='Use the provided info for the histogram title.'
@@ -55,9 +77,29 @@ def _build_arg_parser():
     visu.add_argument('--display_scale', action='store_true',
                       help='Add two buttons play and stop to the scroll bar. ')
 
+    size = p.add_argument_group(title='html size options')
+    size.add_argument('--downsample', type=int, default=1,
+                      help='Average blocks of NxN voxels in each slice. '
+                           '[%(default)s]')
+    size.add_argument('--quantize', action='store_true',
+                      help='Quantize intensities to uint8 (256 levels).')
+    size.add_argument('--color_range', nargs=2, type=float,
+                      metavar=('MIN', 'MAX'),
+                      help='Fixed range of intensities of the colorscale. '
+                           'Default: min and max\nof the volume with '
+                           '--quantize, range of each slice otherwise.')
+    size.add_argument('--z_stride', type=int, default=1,
+                      help='Only add one slice out of N to the slider. '
+                           '[%(default)s]')
+    size.add_argument('--shared_geometry', action='store_true',
+                      help='Frames only contain the colors of their slice, '
+                           'the plane\nis moved by the z axis range instead '
+                           'of being repeated.')
+
     p.add_argument('--show_only', action='store_true',
                    help='Do not save the figure, only display.')
 
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -68,6 +110,11 @@ def main():
     args = p.parse_args()
 
     assert_inputs_exist(p, args.in_image)
+    if args.downsample < 1 or args.z_stride < 1:
+        p.error('--downsample and --z_stride must be >= 1.')
+    if args.triplanar and args.show_only:
+        p.error('--triplanar must be saved with its slices, --show_only is '
+                'not available.')
 
     if args.out_dir is None:
         args.out_dir = './'
@@ -75,8 +122,41 @@ def main():
     if args.out_html is None:
         args.out_html = split_name_with_nii(os.path.basename(args.in_image))[0]
 
-    # load image
-    data = nib.load(args.in_image).get_fdata().T
+    if not args.show_only:
+        assert_outputs_exist(p, args, os.path.join(args.out_dir,
+                                                   args.out_html + '.html'),
+                             check_dir_exists=False)
+    slices_folder = args.out_html + '_slices'
+    if args.triplanar:
+        assert_output_dirs_exist_and_empty(
+            p, args, os.path.join(args.out_dir, slices_folder),
+            create_dir=True)
+
+    # load image, read as float32 through the array proxy
+    img = load_image(args.in_image)
+    try:
+        volume_index = check_volume_index(img, args.volume_index)
+    except ValueError as msg:
+        p.error(str(msg))
+
+    if args.triplanar:
+        fig, post_script = generate_triplanar_view(
+            get_slices(img, volume_index=volume_index), args.out_dir,
+            slices_folder, colorname=args.colorname,
+            title=args.title, color_range=args.color_range,
+            show_scale=args.display_scale)
+        save_figures_as(fig, args.out_dir, args.out_html,
+                        shared_plotlyjs=args.shared_plotlyjs,
+                        post_script=post_script)
+        return
+
+    data = get_slices(img, volume_index=volume_index).T
+
+    data = downsample_volume(data, args.downsample)
+    color_range, value_range = args.color_range, None
+    if args.quantize:
+        data, value_range = quantize_volume(data, args.color_range)
+        color_range = (0, 255)
 
     # Define parameters for grid
     x_size, y_size = data[0].shape
@@ -89,13 +169,17 @@ def main():
                              y_size, args.colorname, title=args.title,
                              prefix_slider='z slice', start_at=7,
                              add_buttons=args.add_buttons,
-                             show_scale=args.display_scale)
+                             show_scale=args.display_scale,
+                             z_stride=args.z_stride, color_range=color_range,
+                             value_range=value_range,
+                             shared_geometry=args.shared_geometry)
 
     # Show or save html page
     if args.show_only:
         fig.show()
     else:
-        save_figures_as(fig, args.out_dir, args.out_html)
+        save_figures_as(fig, args.out_dir, args.out_html,
+                        shared_plotlyjs=args.shared_plotlyjs)
 
 
 if __name__ == "__main__":
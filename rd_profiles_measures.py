@@ -12,11 +12,13 @@ import pandas as pd
 
 from dataframe.func import split_df_by, add_average_from_longitudinal
 from dataframe.utils import load_df
-from scilpy.io.utils import add_overwrite_arg, assert_inputs_exist
+from common.io_utils import (add_overwrite_arg, add_processes_arg,
+                             add_shared_plotlyjs_arg, assert_inputs_exist,
+                             validate_nbr_processes)
 from plots.parameters import dict_plot_profile, metric_colors
-from plots.utils import (check_df_for_columns, check_agreement_with_dict,
-                         save_figures_as)
+from plots.utils import check_df_for_columns, check_agreement_with_dict
 from plots.line import interactive_lineplot
+from plots.render import FigureJob, render_figure_jobs
 
 def _build_arg_parser():
     p = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
@@ -82,23 +84,28 @@ def _build_arg_parser():
     profile.add_argument('--dpi_scale', type=int, default=6,
                          help='Use to increase (>1) or decrease (<1) the '
                               ' image resolution. [%(default)s]')
+    add_shared_plotlyjs_arg(p)
+    add_processes_arg(p)
     add_overwrite_arg(p)
 
     return p
 
 
-def main():
-    parser = _build_arg_parser()
-    args = parser.parse_args()
+def get_figure_jobs(df, args):
+    """
+    Filter the dataframe according to the script options and list the
+    figures to render.
 
-    assert_inputs_exist(parser, args.in_csv)
+    df:     Dataframe loaded from in_csv.
+    args:   Arguments of the script.
 
+    Return  List of FigureJob.
+    """
+    # Defaults are set here, rd_build_site.py lists the figures without
+    # calling main()
     if args.out_dir is None:
         args.out_dir = './'
 
-    # Load and filter Dataframe
-    df = load_df(args.in_csv)
-
     if args.use_stats:
         df = df.loc[df.Statistics == args.use_stats].reset_index(drop=True)
     if args.rbx_version:
@@ -124,50 +131,54 @@ def main():
     if args.add_average:
         df = add_average_from_longitudinal(df, args.use_as_slider, 'Average')
 
+    save_kwargs = dict(is_slider=args.use_as_slider,
+                       save_as_png=args.save_as_png, play=args.autoplay,
+                       shared_plotlyjs=args.shared_plotlyjs)
+
     if args.split_by:
         multi_df, df_names = split_df_by(df, args.split_by)
-        for frame, curr_name in zip(multi_df, df_names):
-            curr_title = args.out_prefix + " Profile for " + curr_name
+        group_profiles = True
+    else:
+        multi_df, df_names = [df], [df['Method'].unique().tolist()[0]]
+        group_profiles = args.longitudinal
+
+    jobs = []
+    for frame, curr_name in zip(multi_df, df_names):
+        curr_title = args.out_prefix + " Profile for " + curr_name
+        if group_profiles:
             frame = frame.groupby([args.plot_args[0], args.use_as_slider,
                                    'Measures']
                                    )[args.plot_args[1]].mean().reset_index()
 
-            fig = interactive_lineplot(
-                        frame, args.plot_args[0], args.plot_args[1],
-                        color_col='Measures', frame=args.use_as_slider,
-                        custom_y_dict=custom_yaxis, x_label=args.plot_args[2],
-                        group = None, y_label=curr_name,
-                        kwgs=dict(args.plot_kwargs),
-                        colormap=metrics_colors, title=curr_title)
-
-            # Save figure
-            save_figures_as(fig, args.out_dir, args.out_prefix  + '_' +
-                            curr_name + '_' + args.out_name,
-                            is_slider=args.use_as_slider,
-                            save_as_png=args.save_as_png, play=args.autoplay)
-    else:
-        single_method = df['Method'].unique().tolist()[0]
-        curr_title = args.out_prefix + " Profile for " + curr_name
+        plot_kwargs = dict(
+                    df=frame, x_col=args.plot_args[0],
+                    y_col=args.plot_args[1], color_col='Measures',
+                    frame=args.use_as_slider, custom_y_dict=custom_yaxis,
+                    x_label=args.plot_args[2], group=None, y_label=curr_name,
+                    kwgs=dict(args.plot_kwargs), colormap=metrics_colors,
+                    title=curr_title)
 
-        if args.longitudinal:
-            df = df.groupby([args.plot_args[0], args.use_as_slider,
-                             'Measures']
-                             )[args.plot_args[1]].mean().reset_index()
-
-        fig = interactive_lineplot(
-                    df, args.plot_args[0], args.plot_args[1],
-                    color_col='Measures', frame=args.use_as_slider,
-                    custom_y_dict=custom_yaxis, x_label=args.plot_args[2],
-                    group = None, y_label=curr_name,
-                    kwgs=dict(args.plot_kwargs),
-                    colormap=metrics_colors, title=curr_title)
-
-        # Save figure
-        save_figures_as(fig, args.out_dir, 
-                        args.out_prefix  + '_' + args.out_name,
-                        is_slider=args.use_as_slider,
-                        save_as_png=args.save_as_png, play=args.autoplay)
+        outname = args.out_prefix + '_' + args.out_name
+        if args.split_by:
+            outname = args.out_prefix + '_' + curr_name + '_' + args.out_name
+
+        jobs.append(FigureJob(interactive_lineplot, plot_kwargs,
+                              args.out_dir, outname, save_kwargs))
+
+    return jobs
+
+
+def main():
+    parser = _build_arg_parser()
+    args = parser.parse_args()
+
+    assert_inputs_exist(parser, args.in_csv)
+    nbr_processes = validate_nbr_processes(parser, args)
+
+    # Load Dataframe
+    df = load_df(args.in_csv)
 
+    render_figure_jobs(get_figure_jobs(df, args), nbr_processes)
 
 
 if __name__ == '__main__':
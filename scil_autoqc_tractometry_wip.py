@@ -28,10 +28,13 @@ import os
 
 import pandas as pd
 import numpy as np
-import plotly.express as px
 
-from scilpy.io.utils import (add_overwrite_arg,
+from plots.utils import write_shared_plotlyjs
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
                              assert_inputs_exist)
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
 
 
 def find_outliers_apriori(df, metric, value_column='value',
@@ -103,6 +106,7 @@ def _build_arg_parser():
                    'By default is current folder.')
     
 
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -160,17 +164,24 @@ def main():
                                   'autoqc_symmary.csv'), index=False)
     
     # Plot the data before QC
+    include_plotlyjs = True
+    if args.shared_plotlyjs:
+        include_plotlyjs = write_shared_plotlyjs(args.out_dir,
+                                                 args.shared_plotlyjs)
     fig = px.box(df.query("metrics == 'volume'"), x="roi", y="value", color="roi", 
                  color_discrete_sequence=set_colors, boxmode="overlay", hover_data=["sid"])
-    fig.write_html(os.path.join(args.out_dir,'box_volume_bundle.html'))
+    fig.write_html(os.path.join(args.out_dir,'box_volume_bundle.html'),
+                   include_plotlyjs=include_plotlyjs)
 
     fig = px.box(df.query("metrics == 'mean_length'"), x="roi", y="value", color="roi", 
                  color_discrete_sequence=set_colors, boxmode="overlay", hover_data=["sid"])
-    fig.write_html(os.path.join(args.out_dir,'box_mean_length_bundle.html'))
+    fig.write_html(os.path.join(args.out_dir,'box_mean_length_bundle.html'),
+                   include_plotlyjs=include_plotlyjs)
 
     fig = px.box(df.query("metrics == 'streamline_count'"), x="roi", y="value", color="roi", 
                  color_discrete_sequence=set_colors, boxmode="overlay", hover_data=["sid"])
-    fig.write_html(os.path.join(args.out_dir,'box_streamline_count_bundle.html'))
+    fig.write_html(os.path.join(args.out_dir,'box_streamline_count_bundle.html'),
+                   include_plotlyjs=include_plotlyjs)
 
 
 if __name__ == '__main__':
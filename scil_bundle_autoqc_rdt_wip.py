@@ -21,6 +21,9 @@ Script returns:
 - box_mean_length_bundle.html : Boxplot of the mean length for each bundle before QC.
 - box_streamline_count_bundle.html : Boxplot of the streamline count for each bundle before QC.
 
+Use --box_stats to build the streamlines boxplot from precomputed statistics (quartiles,
+whiskers and outliers), the HTML size then no longer depends on the number of subjects.
+
 """
 
 import argparse
@@ -28,10 +31,14 @@ import os
 
 import pandas as pd
 import numpy as np
-import plotly.express as px
 
-from scilpy.io.utils import (add_overwrite_arg,
+from plots.utils import write_shared_plotlyjs
+from common.io_utils import (add_overwrite_arg, add_shared_plotlyjs_arg,
                              assert_inputs_exist)
+from common.lazy import lazy_import
+
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
 
 custom_order_box = ['AC', 'PC', 'AF_Left', 'AF_Right', 'CC_Fr_1', 'CC_Fr_2', 
@@ -163,6 +170,149 @@ def plot_interactive_boxplot(df, x, y, color_code, slider_col, color_sequence, c
     return fig
 
 
+def compute_box_statistics(df, group_cols, value_column='Value', whisker=1.5):
+    """
+    Compute the boxplot statistics (quartiles, Tukey fences and outliers) for
+    each group of the dataframe. Quartiles use the linear interpolation, as
+    plotly does when it computes the boxes from raw points.
+
+    Inputs:
+    df : pandas.DataFrame. Dataframe containing the data.
+    group_cols : list. Columns used to group the data (ex. ['Measures', 'Bundles']).
+    value_column : str, optional. Name of the column containing the values.
+                   By default is 'Value'.
+    whisker : float, optional. Length of the whiskers in IQR unit. By default is 1.5.
+
+    Returns:
+    stats : pandas.DataFrame. One row per group with the q1, median, q3,
+            lowerfence and upperfence columns.
+    outliers : pandas.DataFrame. Rows of df located outside the fences.
+    """
+    df = df.loc[df[value_column].notna()]
+    grouped = df.groupby(group_cols)[value_column]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+
+    iqr = stats['q3'] - stats['q1']
+    limits = pd.DataFrame({'low': stats['q1'] - whisker * iqr,
+                           'high': stats['q3'] + whisker * iqr})
+    tmp = df[group_cols + [value_column]].join(limits, on=group_cols)
+    inside = tmp[value_column].between(tmp['low'], tmp['high'])
+
+    # Whiskers stop at the most extreme points inside the limits
+    fences = tmp.loc[inside].groupby(group_cols)[value_column].agg(['min', 'max'])
+    stats['lowerfence'] = fences['min']
+    stats['upperfence'] = fences['max']
+
+    return stats.reset_index(), df.loc[~inside]
+
+
+def plot_precomputed_boxplot(df, x, y, slider_col, color_sequence, custom_y_range,
+                             cutsom_y_label, custom_x_order, title,
+                             font_size=14, template="plotly_white",
+                             hoverdata=["Sid", "QC_global"]):
+    """
+    Plot an interactive boxplot with slider from precomputed box statistics.
+    Unlike plot_interactive_boxplot, only the quartiles, the fences and the
+    outlier points are stored in the figure, so the size of the HTML does not
+    grow with the number of subjects. Boxes are colored by x category.
+
+    Inputs:
+    df : pandas.DataFrame. Dataframe containing the data.
+    x : str. Name of the column to plot on the x-axis.
+    y : str. Name of the column to plot on the y-axis.
+    slider_col : str. Name of the column to use as slider.
+    color_sequence : list. List of colors to use for the boxplot.
+    custom_y_range : dict. Dictionary containing the custom y-axis range for each frame.
+    cutsom_y_label : dict. Dictionary containing the custom y-axis label for each frame.
+    custom_x_order : list. Order of the categories on the x-axis.
+    title : str. Title of the plot.
+    font_size : int, optional. Font size of the plot. By default is 14.
+    template : str, optional. Template of the plot. By default is 'plotly_white'.
+    hoverdata : list, optional. List of columns to show in the hover data of
+                outliers. By default is ["Sid", "QC_global"].
+
+    Returns:
+    fig : plotly figure. Interactive
+    """
+    stats, outliers = compute_box_statistics(df, [slider_col, x], value_column=y)
+
+    # Same category order as category_orders in plotly express
+    x_in_data = df[x].unique().tolist()
+    x_order = [curr_x for curr_x in custom_x_order if curr_x in x_in_data]
+    x_order += [curr_x for curr_x in x_in_data if curr_x not in x_order]
+    x_colors = {curr_x: color_sequence[idx % len(color_sequence)]
+                for idx, curr_x in enumerate(x_order)}
+
+    hoverdata = [col for col in hoverdata if col in outliers.columns]
+    hover_template = '<br>'.join(
+        ['{}=%{{customdata[{}]}}'.format(col, idx)
+         for idx, col in enumerate(hoverdata)] + [y + '=%{y}'])
+
+    frame_names = df[slider_col].unique().tolist()
+    frames = []
+    for frame_name in frame_names:
+        curr_stats = stats.loc[stats[slider_col] == frame_name].set_index(x)
+        curr_outliers = outliers.loc[outliers[slider_col] == frame_name]
+
+        # Keep one trace per category in every frame for the animation
+        traces = []
+        for curr_x in x_order:
+            box_stats = curr_stats.loc[[curr_x]] if curr_x in curr_stats.index \
+                else curr_stats.iloc[0:0]
+            traces.append(go.Box(
+                x=[curr_x] * len(box_stats), q1=box_stats['q1'].values,
+                median=box_stats['median'].values, q3=box_stats['q3'].values,
+                lowerfence=box_stats['lowerfence'].values,
+                upperfence=box_stats['upperfence'].values,
+                name=curr_x, legendgroup=curr_x, boxpoints=False,
+                marker_color=x_colors[curr_x]))
+        traces.append(go.Scatter(
+            x=curr_outliers[x], y=curr_outliers[y], mode='markers',
+            marker_color=curr_outliers[x].map(x_colors).tolist(),
+            customdata=curr_outliers[hoverdata].values,
+            hovertemplate=hover_template, name='outliers', showlegend=False))
+
+        frame_layout = dict(yaxis_title=y)
+        if frame_name in custom_y_range:
+            frame_layout = dict(yaxis_range=custom_y_range[frame_name],
+                                yaxis_title=cutsom_y_label[frame_name])
+        frames.append(go.Frame(data=traces, name=str(frame_name),
+                               layout=frame_layout))
+
+    steps = [dict(method='animate', label=str(frame_name),
+                  args=[[str(frame_name)],
+                        dict(mode='immediate',
+                             frame=dict(duration=0, redraw=True),
+                             transition=dict(duration=0))])
+             for frame_name in frame_names]
+    play_args = dict(frame=dict(duration=500, redraw=True), fromcurrent=True,
+                     mode='immediate', transition=dict(duration=0))
+    stop_args = dict(frame=dict(duration=0, redraw=True), mode='immediate',
+                     transition=dict(duration=0))
+
+    fig = go.Figure(data=frames[0].data, frames=frames)
+    fig.update_layout(frames[0].layout)
+    fig.update_layout(
+        title=title, template=template, boxmode="overlay",
+        xaxis=dict(title=x, categoryorder='array', categoryarray=x_order),
+        sliders=[dict(active=0, steps=steps, x=0.1, len=0.9,
+                      currentvalue=dict(prefix=slider_col + '='))],
+        updatemenus=[dict(type='buttons', direction='left', showactive=False,
+                          x=0.1, xanchor='right', y=0, yanchor='top',
+                          buttons=[dict(label='&#9654;', method='animate',
+                                        args=[None, play_args]),
+                                   dict(label='&#9724;', method='animate',
+                                        args=[[None], stop_args])])])
+
+    fig.update_layout(title_x=0.5, title_y=1, font = dict(size = font_size),
+                      hoverlabel = dict(font_size = font_size),
+                      margin=dict(l=20, r=20, t=20, b=210))
+    fig['layout']['updatemenus'][0]['pad']=dict(r= 10, t= 180)
+    fig['layout']['sliders'][0]['pad']=dict(r= 10, t= 180,)
+
+    return fig
+
 
 def plot_interactive_histogram(df, x, y, color_code, slider_col, title, 
                                font_size=14, template="plotly_white",
@@ -219,7 +369,12 @@ def _build_arg_parser():
                    'By default is current folder.')
     p.add_argument('--rbx_ver',
                    help='Add version of RBX flow.')    
+    p.add_argument('--box_stats', action='store_true',
+                   help='Build the streamlines boxplot from precomputed box '
+                        'statistics. \nOnly quartiles, whiskers and outliers '
+                        'are saved in the HTML.')
 
+    add_shared_plotlyjs_arg(p)
     add_overwrite_arg(p)
 
     return p
@@ -359,23 +514,37 @@ def main():
                                       'df_autoqc_subject_symmary.csv'), index=False)
     
     print('Start plotting...')
+    include_plotlyjs = True
+    if args.shared_plotlyjs:
+        include_plotlyjs = write_shared_plotlyjs(args.out_dir,
+                                                 args.shared_plotlyjs)
+
     # Plot the data before QC
     bundles_colors = ['hsl('+str(h)+',50%'+',50%)' for h in np.linspace(0, 360, N_for_colors)]
-    fig = plot_interactive_boxplot(df_outliers.query("Method == 'Streamlines'"), "Bundles",
-                                   "Value", "Bundles","Measures", bundles_colors, custom_y_range, 
-                                   custom_y_label, custom_order_box, 
-                                   'Streamlines measures distribution')
-    fig.write_html(os.path.join(args.out_dir,'box_streamline_measures_bundle.html'), auto_play=False)
+    if args.box_stats:
+        fig = plot_precomputed_boxplot(df_outliers.query("Method == 'Streamlines'"), "Bundles",
+                                       "Value", "Measures", bundles_colors, custom_y_range,
+                                       custom_y_label, custom_order_box,
+                                       'Streamlines measures distribution')
+    else:
+        fig = plot_interactive_boxplot(df_outliers.query("Method == 'Streamlines'"), "Bundles",
+                                       "Value", "Bundles","Measures", bundles_colors, custom_y_range, 
+                                       custom_y_label, custom_order_box, 
+                                       'Streamlines measures distribution')
+    fig.write_html(os.path.join(args.out_dir,'box_streamline_measures_bundle.html'), auto_play=False,
+                   include_plotlyjs=include_plotlyjs)
 
     qc_bundle_long = df_qc_bundles.melt(id_vars="Bundle", var_name="QC", value_name="Value")
     fig = plot_interactive_histogram(qc_bundle_long, "Bundle", "Value", "Bundle", "QC",
                                      'Summary of QC status for each bundle', custom_x_order=custom_order_box)
-    fig.write_html(os.path.join(args.out_dir,'box_bundle_by_qc_status.html'), auto_play=False)
+    fig.write_html(os.path.join(args.out_dir,'box_bundle_by_qc_status.html'), auto_play=False,
+                   include_plotlyjs=include_plotlyjs)
 
     summary_colors = ['hsl('+str(h)+',50%'+',50%)' for h in np.linspace(0, 360, len(qc_bundle_long.QC.unique()))]
     fig = plot_interactive_histogram(qc_bundle_long, "QC", "Value", "QC", "Bundle",
                                      'Summary of QC status for each bundle', custom_x_order=custom_order_box)
-    fig.write_html(os.path.join(args.out_dir,'box_qc_status_by_bundle.html'), auto_play=False)
+    fig.write_html(os.path.join(args.out_dir,'box_qc_status_by_bundle.html'), auto_play=False,
+                   include_plotlyjs=include_plotlyjs)
 
 
 